@@ -1,4 +1,4 @@
-from bs4 import BeautifulSoup
+from html_parsers import make_soup
 import os
 import json
 
@@ -9,8 +9,8 @@ os.makedirs("output", exist_ok=True)
 with open('output/tracker_page.html', 'r', encoding='utf-8') as f:
     html_content = f.read()
 
-# Parse the HTML
-soup = BeautifulSoup(html_content, 'html.parser')
+# Parse the HTML with the fastest installed tree builder
+soup = make_soup(html_content)
 
 # Find all guide elements - try different class names
 guide_elements = soup.find_all("div", class_="guide-tile")
@@ -1,14 +1,31 @@
 import requests
-import json
-import time
-import random
+import asyncio
 import os
 import re
+import argparse
 from urllib.parse import urljoin
+from http_cache import HttpCache
+from rate_limiter import AdaptiveRateLimiter, AsyncRateLimitedSession, RateLimitedSession
+from retry import FetchError, InvalidResponseError, RetryPolicy
+from clip_store import SeenClips, load_known_keys, load_previous_clips, merge_clips
+from jsonl_sink import JsonLinesSink, iter_json_lines, write_clips_json
+from tag_classifier import classify_tags
+from clip_index import ClipIndex
+from clip import Clip, clip_key
+from output_file import with_compression
+from run_metrics import RunMetrics, write_run_metrics
+from async_http import AsyncHttpClient
+
+# API endpoint of the clips, and the site the sourceURLs of the clips point to
+BASE_URL = "https://api.tracker.gg/api/v2/valorant/guides/clips"
+SITE_URL = "https://tracker.gg"
 
 class ApiScraper:
-    def __init__(self):
-        self.base_url = "https://api.tracker.gg/api/v2/valorant/guides/clips"
+    def __init__(self, cache=None, sink=None, rate_limiter=None, retry_policy=None, index=None, base_url=BASE_URL,
+                 site_url=SITE_URL, metrics=None):
+        # Point base_url and site_url at a replay_server.ReplayServer to scrape without the network
+        self.base_url = base_url
+        self.site_url = site_url
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "Accept": "application/json, text/plain, */*",
@@ -18,102 +35,116 @@ class ApiScraper:
             "Connection": "keep-alive"
         }
         
-        # Agent ID mapping
-        self.agent_ids = {
-            "Astra": "41fb69c1-4189-7b37-f117-bcaf1e96f1bf",
-            "Breach": "5f8d3a7f-467b-97f3-062c-13acf203c006",
-            "Brimstone": "9f0d8ba9-4140-b941-57d3-a7ad57c6b417",
-            "Chamber": "22697a3d-45bf-8dd7-4fec-84a9e28c69d7",
-            "Clove": "1dbf2edd-4729-0984-3115-daa5eed44993",
-            "Cypher": "117ed9e3-49f3-6512-3ccf-0cada7e3823b",
-            "Deadlock": "cc8b64c8-4b25-4ff9-6e7f-37b4da43d235",
-            "Fade": "dade69b4-4f5a-8528-247b-219e5a1facd6",
-            "Gekko": "e370fa57-4757-3604-3648-499e1f642d3f",
-            "Harbor": "95b78ed7-4637-86d9-7e41-71ba8c293152",
-            "Iso": "0e38b510-41a8-5780-5e8f-568b2a4f2d6c",
-            "Jett": "add6443a-41bd-e414-f6ad-e58d267f4e95",
-            "KAY/O": "601dbbe7-43ce-be57-2a40-4abd24953621",
-            "Killjoy": "1e58de9c-4950-5125-93e9-a0aee9f98746",
-            "Neon": "bb2a4828-46eb-8cd1-e765-15848195d751",
-            "Omen": "8e253930-4c05-31dd-1b6c-968525494517",
-            "Phoenix": "eb93336a-449b-9c1b-0a54-a891f7921d69",
-            "Raze": "f94c3b30-42be-e959-889c-5aa313dba261",
-            "Reyna": "a3bfb853-43b2-7238-a4f1-ad90e9e46bcc",
-            "Sage": "569fdd95-4d10-43ab-ca70-79becc718b46",
-            "Skye": "6f2a04ca-43e0-be17-7f36-b3908627744d",
-            "Sova": "320b2a48-4d9b-a075-30f1-1f93a9b638fa",
-            "Tejo": "b444168c-4e35-8076-db47-ef9bf368f384",
-            "Viper": "707eab51-4836-f488-046a-cda6bf494859",
-            "Vyse": "efba5359-4016-a1e5-7626-b1ae76895940",
-            "Yoru": "7f94d92c-4234-0a36-9646-3a87eb8b5c89"
-        }
+        # Optional http_cache.HttpCache for the API pages
+        self.cache = cache
         
-        # Map ID mapping
-        self.map_ids = {
-            "Abyss": "Infinity",
-            "Ascent": "Ascent",
-            "Bind": "Duality",
-            "Breeze": "Foxtrot",
-            "Fracture": "Canyon",
-            "Haven": "Triad",
-            "Icebox": "Port",
-            "Lotus": "Jam",
-            "Sunset": "Juliett",
-            "Split": "Bonsai",
-            "Pearl": "Pitt"
-        }
+        # One session so consecutive pages reuse the keep-alive connection (see scrape_async for pipelining)
+        self.session = requests.Session()
         
-        # Team ID mapping
-        self.team_ids = {
-            "Attack": "Red",
-            "Defense": "Blue"
-        }
+        # Adaptive per-host rate limiter instead of fixed delays between pages
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(initial_rate=1.0)
+        
+        # Transient failures are retried with backoff, a per-host circuit breaker stops hammering a dead host
+        self.retry_policy = retry_policy or RetryPolicy()
+        
+        # Request latencies, bytes, parse times and skip reasons (see run_metrics)
+        self.metrics = metrics or RunMetrics()
         
         self.results = []
+        
+        # Keys of the clips collected so far, the listing shifts during long crawls and repeats clips
+        self.seen = SeenClips()
+        
+        # Optional clip_index.ClipIndex the output is merged into (see save_to_json)
+        self.index = index
+        
+        # Optional jsonl_sink.JsonLinesSink: clips are streamed to disk instead of kept in self.results
+        self.sink = sink
+        
+        # Incremental mode: keys (see clip.clip_key) of the clips of the previous output (see load_known_clips)
+        self.known_keys = None
+        self.known_entries = 0
+        self.page_entries = 0
+        self.page_known_entries = 0
     
-    def get_agent_id(self, agent_name):
-        """Convert agent name to agent ID"""
-        return self.agent_ids.get(agent_name, "")
-    
-    def get_map_id(self, map_name):
-        """Convert map name to map ID"""
-        return self.map_ids.get(map_name, "")
-    
-    def get_team_id(self, team_name):
-        """Convert team name to team ID"""
-        return self.team_ids.get(team_name, "Neutral")
+    def add_results(self, page_results):
+        """Keep the clips of a page in memory, or stream them to the sink and flush"""
+        page_results = self.seen.filter(page_results)
+        self.metrics.count("scraper_clips_total", len(page_results))
+        if self.sink:
+            self.sink.write_many(page_results)
+            self.sink.flush()
+        else:
+            self.results.extend(page_results)
     
-    def clean_tags(self, tags):
-        """Remove map, team, and agent from tags"""
-        if not tags:
-            return []
-            
-        clean_tags = []
-        for tag in tags:
-            # Skip if tag is a map, team, or agent
-            if tag in self.map_ids or tag in ["Attack", "Defense"] or tag in self.agent_ids:
-                continue
-            clean_tags.append(tag)
-        return clean_tags
+    def load_known_clips(self, filename):
+        """Enable incremental mode using the clips of a previous output file"""
+        self.known_keys = load_known_keys(filename)
+        print(f"Loaded {len(self.known_keys)} known clips from {filename}")
     
     def fetch_page(self, page_num):
-        """Fetch a specific page of clips from the API"""
+        """Fetch a specific page of clips from the API
+
+        Raises retry.FetchError if the page can't be fetched, so a failed request
+        is never mistaken for the end of the clips.
+        """
         url = f"{self.base_url}?page={page_num}"
+        
+        def attempt():
+            session = RateLimitedSession(self.session, self.rate_limiter, self.metrics, "api")
+            if self.cache:
+                response = self.cache.get(session, url, self.headers, "api")
+            else:
+                response = session.get(url, headers=self.headers)
+            response.raise_for_status()
+            return self.read_page(page_num, url, response)
+        
         try:
-            response = requests.get(url, headers=self.headers)
+            return self.retry_policy.call(url, attempt, "api", wait=True)
+        except FetchError as e:
+            self.print_fetch_error(page_num, e)
+            raise
+    
+    async def fetch_page_async(self, client, page_num):
+        """fetch_page() over an async client (see async_http.AsyncHttpClient)"""
+        url = f"{self.base_url}?page={page_num}"
+        
+        async def attempt():
+            session = AsyncRateLimitedSession(client, self.rate_limiter, self.metrics, "api")
+            if self.cache:
+                response = await self.cache.get_async(session, url, self.headers, "api")
+            else:
+                response = await session.get(url, headers=self.headers)
             response.raise_for_status()
+            return self.read_page(page_num, url, response)
+        
+        try:
+            return await self.retry_policy.call_async(url, attempt, "api", wait=True)
+        except FetchError as e:
+            self.print_fetch_error(page_num, e)
+            raise
+    
+    def print_fetch_error(self, page_num, error):
+        print(f"Error fetching page {page_num}: {error}")
+        response = getattr(error.__cause__, 'response', None)
+        if response is not None:
+            print(f"Response status code: {response.status_code}")
+            print(f"Response headers: {response.headers}")
+    
+    def read_page(self, page_num, url, response):
+        """Decode a fetched API page, raises retry.InvalidResponseError (retried) if it isn't JSON"""
+        # Save the raw API response for debugging
+        with open(f"output/api_page_{page_num}.json", "w", encoding="utf-8") as f:
+            f.write(response.text)
             
-            # Save the raw API response for debugging
-            with open(f"output/api_page_{page_num}.json", "w", encoding="utf-8") as f:
-                f.write(response.text)
-                
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching page {page_num}: {e}")
-            if hasattr(e, 'response') and e.response:
-                print(f"Response status code: {e.response.status_code}")
-                print(f"Response headers: {e.response.headers}")
-            return None
+        try:
+            with self.metrics.timer("scraper_parse_seconds", kind="api_json"):
+                return response.json()
+        except ValueError as e:
+            # A challenge or error page, don't keep serving it from the cache
+            if self.cache:
+                self.cache.discard(url)
+            raise InvalidResponseError(f"response is not JSON: {e}") from e
     
     def process_clip(self, clip_data):
         """Process a single clip from the API data"""
@@ -126,29 +157,8 @@ class ApiScraper:
             tags = clip_data.get('tags', [])
             tag_names = [tag.get('name', '') for tag in tags] if tags else []
             
-            # Extract map ID from tags
-            map_id = ""
-            for tag in tag_names:
-                if tag in self.map_ids:
-                    map_id = self.get_map_id(tag)
-                    break
-            
-            # Extract team ID from tags
-            team_id = "Neutral"
-            for tag in tag_names:
-                if tag in self.team_ids:
-                    team_id = self.get_team_id(tag)
-                    break
-            
-            # Extract agent ID from tags
-            agent_id = ""
-            for tag in tag_names:
-                if tag in self.agent_ids:
-                    agent_id = self.get_agent_id(tag)
-                    break
-            
-            # Clean tags (remove map, team, agent)
-            clean_tags = self.clean_tags(tag_names)
+            # Split the tags into map, team, agent and the remaining tags
+            map_id, team_id, agent_id, clean_tags = classify_tags(tag_names)
             
             # Extract video URL
             video_url = clip_data.get('videoUrl', '')
@@ -163,35 +173,25 @@ class ApiScraper:
                 author = author_data.get('name', '')
             
             # Extract source URL
-            source_url = f"https://tracker.gg/valorant/guides/clips/{clip_data.get('id', '')}" if clip_data.get('id') else ""
+            source_url = f"{self.site_url}/valorant/guides/clips/{clip_data.get('id', '')}" if clip_data.get('id') else ""
             
-            # Create clip data dictionary
-            processed_clip = {
-                "title": title,
-                "description": description,
-                "tags": clean_tags
-            }
-            
-            # Only add non-empty fields
-            if map_id:
-                processed_clip["mapID"] = map_id
-            if team_id != "Neutral":
-                processed_clip["teamID"] = team_id
-            if agent_id:
-                processed_clip["agentID"] = agent_id
-            if video_url:
-                processed_clip["videoURL"] = video_url
-            if thumbnail_url:
-                processed_clip["thumbnailURL"] = thumbnail_url
-            if author:
-                processed_clip["author"] = author
-            if source_url:
-                processed_clip["sourceURL"] = source_url
-                
-            return processed_clip
+            # Empty fields are left out of the output by Clip.to_dict()
+            return Clip(
+                title=title,
+                description=description,
+                tags=clean_tags,
+                map_id=map_id,
+                team_id=team_id,
+                agent_id=agent_id,
+                video_url=video_url,
+                thumbnail_url=thumbnail_url,
+                author=author,
+                source_url=source_url
+            )
             
         except Exception as e:
             print(f"Error processing clip: {e}")
+            self.metrics.count("scraper_skipped_clips_total", reason="error")
             return None
     
     def process_page(self, page_data):
@@ -203,10 +203,19 @@ class ApiScraper:
         print(f"Found {len(clips_data)} clips in the API response")
         
         page_results = []
-        for clip_data in clips_data:
-            processed_clip = self.process_clip(clip_data)
-            if processed_clip:
-                page_results.append(processed_clip)
+        with self.metrics.timer("scraper_parse_seconds", kind="api"):
+            for clip_data in clips_data:
+                processed_clip = self.process_clip(clip_data)
+                if processed_clip:
+                    page_results.append(processed_clip)
+        
+        # Incremental mode: drop clips we already have
+        self.page_entries = len(page_results)
+        self.page_known_entries = 0
+        if self.known_keys is not None:
+            page_results = [clip for clip in page_results if clip_key(clip) not in self.known_keys]
+            self.page_known_entries = self.page_entries - len(page_results)
+            self.known_entries += self.page_known_entries
                 
         return page_results
     
@@ -221,55 +230,220 @@ class ApiScraper:
         
         return current_page < total_pages
     
-    def scrape(self, start_page=1, max_pages=None):
-        """Scrape clips from tracker.gg API, starting from start_page"""
+    def total_pages(self, page_data):
+        """Total number of pages according to the API response, None if unknown"""
+        if not page_data or 'data' not in page_data:
+            return None
+        return page_data['data'].get('pagination', {}).get('totalPages')
+    
+    def scrape_page(self, page_num):
+        """Fetch and process a single page, returns its clips and whether there is a next page"""
+        page_data = self.fetch_page(page_num)
+        return self.process_page(page_data), self.has_next_page(page_data)
+    
+    def probe_total_pages(self):
+        """Read the total number of pages from the pagination of the first API page"""
+        return self.total_pages(self.fetch_page(1))
+    
+    def scrape(self, start_page=1, max_pages=None, known_threshold=1.0):
+        """Scrape clips from tracker.gg API, starting from start_page
+
+        In incremental mode (see load_known_clips) paging stops at the first page
+        where at least known_threshold of the clips are already known.
+        """
         current_page = start_page
-        has_next_page = True
         
-        while has_next_page:
+        while True:
             print(f"Scraping page {current_page}...")
             
-            # Fetch the page data from the API
-            page_data = self.fetch_page(current_page)
-            
-            # Process the page data
-            page_results = self.process_page(page_data)
-            self.results.extend(page_results)
-            
-            print(f"Processed {len(page_results)} clips from page {current_page}")
-            
-            # Check if there's a next page
-            has_next_page = self.has_next_page(page_data)
+            # Fetch the page data from the API, keeping the clips scraped so far if it keeps failing
+            try:
+                page_data = self.fetch_page(current_page)
+            except FetchError as e:
+                print(f"Stopping at page {current_page}, keeping the clips of the earlier pages: {e}")
+                break
             
-            # Stop if we've reached the maximum number of pages
-            if max_pages and current_page >= start_page + max_pages - 1:
+            if not self.finish_page(current_page, page_data, start_page, max_pages, known_threshold):
                 break
                 
-            # Move to the next page
+            # Move to the next page (the rate limiter spaces out the requests)
             current_page += 1
-            
-            # Add a delay to avoid overloading the server
-            time.sleep(random.uniform(1, 3))
         
+        self.print_stats()
+        return self.results
+    
+    async def scrape_async(self, start_page=1, max_pages=None, known_threshold=1.0, concurrency=8, client=None):
+        """scrape() with pipelined page fetches on the asyncio engine
+        
+        Once the first page tells the number of pages, the following pages are
+        fetched concurrently (at most concurrency at a time, over pooled
+        keep-alive connections) while the rate limiter still spaces out the
+        requests. Pages are processed in order exactly like in scrape(), and
+        the fetches still in flight are cancelled when the crawl stops early.
+        client defaults to an async_http.AsyncHttpClient (needs aiohttp).
+        """
+        if client is None:
+            async with AsyncHttpClient(concurrency) as client:
+                return await self.scrape_async(start_page, max_pages, known_threshold, concurrency, client)
+        
+        last_page = start_page + max_pages - 1 if max_pages else None
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = {}
+        
+        async def fetch(page_num):
+            async with semaphore:
+                return await self.fetch_page_async(client, page_num)
+        
+        def schedule(first_page, end_page):
+            for page_num in range(first_page, end_page + 1):
+                if page_num not in tasks and (last_page is None or page_num <= last_page):
+                    tasks[page_num] = asyncio.ensure_future(fetch(page_num))
+        
+        current_page = start_page
+        schedule(current_page, current_page)
+        try:
+            while True:
+                print(f"Scraping page {current_page}...")
+                try:
+                    page_data = await tasks.pop(current_page)
+                except FetchError as e:
+                    print(f"Stopping at page {current_page}, keeping the clips of the earlier pages: {e}")
+                    break
+                
+                # Queue every page once the total is known, otherwise keep concurrency pages ahead
+                total_pages = self.total_pages(page_data)
+                schedule(current_page + 1, total_pages or current_page + concurrency)
+                
+                if not self.finish_page(current_page, page_data, start_page, max_pages, known_threshold):
+                    break
+                
+                current_page += 1
+                schedule(current_page, current_page)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+        
+        self.print_stats()
         return self.results
     
-    def save_to_json(self, filename="tracker_clips.json"):
-        """Save the results to a JSON file"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.results, f, indent=4, ensure_ascii=False)
-        print(f"Saved {len(self.results)} clips to {filename}")
+    def finish_page(self, page_num, page_data, start_page, max_pages, known_threshold):
+        """Process a fetched page and add its clips, returns whether the crawl goes on"""
+        # Process the page data
+        page_results = self.process_page(page_data)
+        self.add_results(page_results)
+        
+        print(f"Processed {len(page_results)} clips from page {page_num}")
+        
+        # In incremental mode, stop once we've caught up with the previous crawl
+        if self.page_known_entries and self.page_known_entries >= known_threshold * self.page_entries:
+            print(f"{self.page_known_entries} of {self.page_entries} clips on page {page_num} are already known, stopping.")
+            return False
+        
+        # Stop if we've reached the maximum number of pages
+        if max_pages and page_num >= start_page + max_pages - 1:
+            return False
+        
+        # Check if there's a next page
+        return self.has_next_page(page_data)
+    
+    def print_stats(self):
+        if self.known_entries > 0:
+            print(f"Skipped {self.known_entries} already known entries")
+        if self.seen.duplicates > 0:
+            print(f"Dropped {self.seen.duplicates} duplicate clips repeated by the shifting listing")
+        if self.cache:
+            print(f"HTTP cache: {self.cache.stats()}")
+        if self.retry_policy.retries or self.retry_policy.failures:
+            print(f"Retries: {self.retry_policy.stats()}")
+        if isinstance(self.rate_limiter, AdaptiveRateLimiter):
+            print(f"Request rates: {self.rate_limiter.rates()} ({self.rate_limiter.throttled_responses} throttled responses)")
+    
+    def save_to_index(self, filename):
+        """Merge the crawl into the clip index, returns the clips to write in index order
+        
+        An incremental crawl only adds and updates clips; a full crawl also
+        removes the clips that are no longer listed.
+        """
+        # First run with an index: start from the previous output
+        previous_clips = load_previous_clips(filename) if not len(self.index) else None
+        if previous_clips:
+            self.index.update(previous_clips)
+        
+        if self.sink:
+            self.sink.close()
+            clips = iter_json_lines(self.sink.path)
+        else:
+            clips = self.results
+        
+        stats = self.index.update(clips)
+        if self.known_keys is None:
+            stats["removed"] = len(self.index.prune())
+        print(f"Clip index version {self.index.version}: {stats}")
+        return self.index.records()
+    
+    def save_to_json(self, filename="tracker_clips.json", compact=False):
+        """Save the results to a JSON file (minified with compact, compressed if it ends in .gz or .zst)"""
+        # With an index the crawl is merged into the latest record of every clip
+        if self.index is not None:
+            count = write_clips_json(filename, self.save_to_index(filename), compact=compact)
+            print(f"Saved {count} clips to {filename}")
+            return
+        
+        # In incremental mode only the new clips were scraped, merge them into the previous data
+        previous_clips = load_previous_clips(filename) if self.known_keys is not None else None
+        
+        # Streaming mode: build the file from the stream without loading it
+        if self.sink:
+            count = self.sink.finalize(filename, previous_clips=previous_clips, compact=compact)
+            print(f"Saved {count} clips to {filename} ({self.sink.count} scraped in this run)")
+            return
+        
+        data = self.results
+        if previous_clips is not None:
+            data = merge_clips(self.results, previous_clips)
+        
+        write_clips_json(filename, data, compact=compact)
+        print(f"Saved {len(data)} clips to {filename} ({len(self.results)} scraped in this run)")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Valorant guide clips from the tracker.gg API")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only scrape clips that are newer than the previous output")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream clips to output/tracker_clips.jsonl as they are scraped")
+    parser.add_argument("--compact", action="store_true", help="write minified JSON instead of indented JSON")
+    parser.add_argument("--compress", choices=["gzip", "zstd"],
+                        help="compress the output (.gz or .zst appended to the file name, zstd needs zstandard)")
+    parser.add_argument("--report", default="output/run_report.json",
+                        help="JSON run report with request latencies, bytes, parse times, retries and skip reasons")
+    parser.add_argument("--prometheus", default=None, help="also write the metrics to this Prometheus text file")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="fetch this many pages at a time with the asyncio engine (needs aiohttp)")
+    args = parser.parse_args()
+    
     # Create output directory if it doesn't exist
     os.makedirs("output", exist_ok=True)
     
-    # Create the scraper
-    scraper = ApiScraper()
+    # Create the scraper with a persistent response cache so reruns don't redownload everything
+    sink = JsonLinesSink("output/tracker_clips.jsonl") if args.stream else None
+    scraper = ApiScraper(cache=HttpCache("output/http_cache.sqlite"), sink=sink, index=ClipIndex("output/clip_index.sqlite"))
+    
+    # Incremental mode: stop at the clips we already have and merge the new ones
+    output_file = with_compression("output/tracker_clips.json", args.compress)
+    if args.incremental:
+        scraper.load_known_clips(output_file)
     
     # Scrape the clips (optionally specify max_pages to limit the number of pages)
     # scraper.scrape(max_pages=5)  # Uncomment to limit to 5 pages
-    scraper.scrape()
+    if args.concurrency > 1:
+        asyncio.run(scraper.scrape_async(concurrency=args.concurrency))
+    else:
+        scraper.scrape()
     
     # Save the results to a JSON file
-    scraper.save_to_json("output/tracker_clips.json")
+    scraper.save_to_json(output_file, compact=args.compact)
+    
+    # Where the time went: network, Cloudflare (retries, throttling) or parsing
+    write_run_metrics(scraper, args.report, args.prometheus)
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Optional asyncio HTTP client
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncResponse:
+    """A fully read aiohttp response that behaves like a requests.Response
+    
+    raise_for_status() and the connection errors raise the requests
+    exceptions, so retry.is_retryable, the rate limiters and the HTTP cache
+    work the same for both engines.
+    """
+    def __init__(self, url, status_code, content, headers):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers)
+    
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+    
+    def json(self):
+        return json.loads(self.text)
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class AsyncHttpClient:
+    """Pooled keep-alive HTTP client for asyncio, used as `async with AsyncHttpClient() as client`
+    
+    At most concurrency connections are open at a time and they are reused
+    between requests, so pages don't pay a TCP and TLS handshake each. Any
+    object with the same `async get(url, headers=None)` returning a
+    requests-like response (e.g. a local stand-in in a test) can be used
+    instead.
+    """
+    def __init__(self, concurrency=8, timeout=30, headers=None):
+        if aiohttp is None:
+            raise ImportError("The async engine requires 'pip install aiohttp'")
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.headers = headers
+        self.session = None
+    
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        self.session = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.session.close()
+    
+    async def get(self, url, headers=None):
+        try:
+            async with self.session.get(url, headers=headers) as response:
+                content = await response.read()
+                return AsyncResponse(str(response.url), response.status, content, response.headers)
+        except asyncio.TimeoutError as e:
+            raise requests.exceptions.Timeout(f"Timed out fetching {url}") from e
+        except aiohttp.ClientError as e:
+            raise requests.exceptions.ConnectionError(f"{e.__class__.__name__} fetching {url}: {e}") from e
@@ -0,0 +1,258 @@
+import argparse
+import atexit
+import contextlib
+import gc
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import synthetic
+from api_scraper import ApiScraper
+from jsonl_sink import write_clips_json
+from tag_classifier import classify_tags
+from tracker_scraper import TrackerScraper
+
+# Baseline the results are compared with (see --save-baseline)
+BASELINE_FILE = "output/benchmark_baseline.json"
+
+# Clips per synthetic listing page, like the real listing
+CLIPS_PER_PAGE = 24
+
+# Memory differences below this many KB are noise, not regressions
+MEMORY_SLACK_KB = 256
+
+# Linux lets a process reset its peak RSS (VmHWM), see proc(5)
+CLEAR_REFS = "/proc/self/clear_refs"
+
+
+def tracker_scraper(parser="auto"):
+    """A TrackerScraper that never touches the network: video URLs come from the thumbnails"""
+    return TrackerScraper(max_workers=1, requests_per_second=None, fast_path=True, parser=parser)
+
+
+def bench_parse_page(size, distribution, parser):
+    """Parse listing pages into clips with TrackerScraper.parse_page"""
+    scraper = tracker_scraper(parser)
+    pages = -(-size // CLIPS_PER_PAGE)
+    pages_html = [synthetic.listing_html(page_num, CLIPS_PER_PAGE, pages, distribution) for page_num in range(1, pages + 1)]
+    
+    def run():
+        return [clip for html_content in pages_html for clip in scraper.parse_page(html_content)]
+    return run, pages * CLIPS_PER_PAGE
+
+
+def bench_parse_clip(size, distribution):
+    """Build clips from already parsed tiles with TrackerScraper.parse_clip"""
+    scraper = tracker_scraper()
+    pages = -(-size // CLIPS_PER_PAGE)
+    tiles = []
+    for page_num in range(1, pages + 1):
+        tiles.extend(scraper.parser.parse_listing(synthetic.listing_html(page_num, CLIPS_PER_PAGE, pages, distribution)).tiles)
+    
+    def run():
+        return [scraper.parse_clip(raw_tile) for raw_tile in tiles]
+    return run, len(tiles)
+
+
+def bench_process_clip(size, distribution):
+    """Build clips from API items with ApiScraper.process_clip"""
+    scraper = ApiScraper()
+    items = [synthetic.api_clip(clip_id, distribution) for clip_id in range(size)]
+    
+    def run():
+        return [scraper.process_clip(clip_data) for clip_data in items]
+    return run, size
+
+
+def bench_classify_tags(size, distribution):
+    """Split tag lists into map, team, agent and the remaining tags"""
+    tag_lists = [synthetic.clip_tags(clip_id, distribution) for clip_id in range(size)]
+    
+    def run():
+        return [classify_tags(tags) for tags in tag_lists]
+    return run, size
+
+
+def bench_save_to_json(size, distribution, compact=False, suffix=".json"):
+    """Write the clips as the versioned output document"""
+    clips = list(synthetic.corpus(size, distribution))
+    directory = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, directory, True)
+    filename = os.path.join(directory, "clips" + suffix)
+    
+    def run():
+        write_clips_json(filename, clips, 1, compact)
+    return run, size
+
+
+# Stage name -> function(size, distribution) returning (run, clips processed by one run).
+# run() keeps what it builds, so the peak memory includes the clips of the stage
+STAGES = {
+    "parse_page[selectolax]": lambda size, distribution: bench_parse_page(size, distribution, "selectolax"),
+    "parse_page[lxml]": lambda size, distribution: bench_parse_page(size, distribution, "lxml"),
+    "parse_page[html.parser]": lambda size, distribution: bench_parse_page(size, distribution, "html.parser"),
+    "parse_clip": bench_parse_clip,
+    "process_clip": bench_process_clip,
+    "classify_tags": bench_classify_tags,
+    "save_to_json": bench_save_to_json,
+    "save_to_json[compact]": lambda size, distribution: bench_save_to_json(size, distribution, compact=True),
+    "save_to_json[gzip]": lambda size, distribution: bench_save_to_json(size, distribution, True, ".json.gz")
+}
+
+
+def memory_status():
+    """VmRSS and VmHWM (peak RSS) of the process in KB"""
+    status = {}
+    with open("/proc/self/status", "r", encoding="utf-8") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "VmHWM"):
+                status[name] = int(value.split()[0])
+    return status
+
+
+def rss_growth(stage, size, distribution):
+    """How far one run of a stage raises the RSS above what its input takes, in KB (None if not on Linux)"""
+    if not os.path.exists(CLEAR_REFS):
+        return None
+    run, _ = STAGES[stage](size, distribution)
+    gc.collect()
+    
+    # Reset the peak so generating the input doesn't count
+    with open(CLEAR_REFS, "w") as f:
+        f.write("5")
+    before = memory_status()["VmRSS"]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        run()
+    return memory_status()["VmHWM"] - before
+
+
+def measure(stage, size, distribution, repeat=3):
+    """Run a stage on size clips, returns its throughput and peak memory
+    
+    The best of repeat timed runs gives the throughput. heap_kb is the peak of
+    the Python heap during one more run under tracemalloc, which slows Python
+    code down too much to be timed. tracemalloc doesn't see the C side of
+    lxml and selectolax trees, so rss_kb is the growth of the peak RSS during
+    one run in a fresh process (Linux only, None elsewhere). Generating the input isn't measured, and the
+    progress output of the scrapers goes to /dev/null.
+    """
+    run, clips = STAGES[stage](size, distribution)
+    
+    timings = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            gc.collect()
+            start_time = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start_time)
+        
+        gc.collect()
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        rss_kb = executor.submit(rss_growth, stage, size, distribution).result()
+    
+    seconds = min(timings)
+    
+    return {
+        "stage": stage,
+        "size": size,
+        "distribution": distribution,
+        "seconds": round(seconds, 6),
+        "clips_per_second": round(clips / seconds, 1) if seconds else None,
+        "heap_kb": round(peak / 1024, 1),
+        "rss_kb": rss_kb
+    }
+
+
+def result_key(result):
+    return f"{result['stage']}@{result['size']}/{result['distribution']}"
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Regressions against a baseline: stages that got slower or use more memory by more than tolerance"""
+    regressions = []
+    for result in results:
+        previous = baseline.get(result_key(result))
+        if not previous:
+            continue
+        if result["clips_per_second"] < previous["clips_per_second"] * (1 - tolerance):
+            regressions.append(f"{result_key(result)}: {result['clips_per_second']:.0f} clips/s, "
+                               f"baseline {previous['clips_per_second']:.0f}")
+        for memory in ("heap_kb", "rss_kb"):
+            if result.get(memory) is None or previous.get(memory) is None:
+                continue
+            if result[memory] > previous[memory] * (1 + tolerance) + MEMORY_SLACK_KB:
+                regressions.append(f"{result_key(result)}: {memory} {result[memory]:.0f}, "
+                                   f"baseline {previous[memory]:.0f}")
+    return regressions
+
+
+def print_results(results, baseline):
+    print(f"{'stage':<26}{'clips':>9}{'seconds':>11}{'clips/s':>13}{'heap KB':>12}{'RSS KB':>12}{'vs baseline':>13}")
+    for result in results:
+        previous = baseline.get(result_key(result))
+        change = ""
+        if previous:
+            change = f"{result['clips_per_second'] / previous['clips_per_second'] - 1:+.0%}"
+        rss = f"{result['rss_kb']:.0f}" if result["rss_kb"] is not None else "-"
+        print(f"{result['stage']:<26}{result['size']:>9}{result['seconds']:>11.4f}{result['clips_per_second']:>13.0f}"
+              f"{result['heap_kb']:>12.0f}{rss:>12}{change:>13}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the parse, classify and serialize stages on synthetic clips")
+    parser.add_argument("--stages", nargs="*", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--sizes", nargs="*", type=int, default=[1000, 10000],
+                        help="corpus sizes in clips (e.g. 1000 10000 100000 1000000)")
+    parser.add_argument("--distribution", default="uniform", choices=synthetic.TAG_DISTRIBUTIONS,
+                        help="how the tags of the synthetic clips are drawn")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage, the best one counts")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="fraction a stage may get slower or bigger before it counts as a regression")
+    parser.add_argument("--report", default=None, help="also write the results to this JSON file")
+    args = parser.parse_args()
+    
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    
+    results = []
+    for size in args.sizes:
+        for stage in args.stages:
+            try:
+                results.append(measure(stage, size, args.distribution, args.repeat))
+            except ImportError as e:
+                print(f"Skipping {stage}: {e}")
+    
+    print_results(results, baseline)
+    
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+    
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        baseline.update({result_key(result): result for result in results})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=4)
+        print(f"Saved the baseline to {args.baseline}")
+    
+    regressions = compare(results, baseline if not args.save_baseline else {}, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
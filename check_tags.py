@@ -1,20 +1,19 @@
-import json
+import numpy as np
+from clip_columns import ClipColumns
+from tag_classifier import TEAM
 
-# Load the data
-with open('output/tracker_clips.json', 'r') as f:
-    data = json.load(f)
+# Load the data into columns (handles the versioned and the plain list output)
+columns = ClipColumns.load('output/tracker_clips.json')
 
 # Check for attack/defense tags
-attack_defense_count = 0
-for clip in data:
-    for tag in clip['tags']:
-        if tag.lower() in ['attack', 'defense']:
-            attack_defense_count += 1
-            break
+attack_defense_count = int(np.count_nonzero(columns.has_tag('attack', 'defense')))
 
-print(f'Found {attack_defense_count} clips with attack/defense tags out of {len(data)} total clips')
+print(f'Found {attack_defense_count} clips with attack/defense tags out of {len(columns)} total clips')
+
+# Teams per clip, including the ones only given as a tag
+print(f"Team IDs: {columns.count_by(TEAM, classify=True)}")
 
 # Print the first 5 clips' tags
 print("\nFirst 5 clips' tags:")
-for i in range(min(5, len(data))):
-    print(f"Clip {i+1}: {data[i]['tags']}")
+for i in range(min(5, len(columns))):
+    print(f"Clip {i+1}: {columns.tags_of(i)}")
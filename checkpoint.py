@@ -0,0 +1,39 @@
+import json
+import os
+
+class Checkpoint:
+    """Crawl progress saved to a small JSON file after every page.
+
+    The file is replaced atomically (write to a temp file, fsync, rename), so
+    it always holds either the previous or the new state, never a torn write.
+    """
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+    
+    def load(self):
+        """Return the saved state, or None if there is no usable checkpoint"""
+        if not os.path.exists(self.path):
+            return None
+        
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading checkpoint {self.path}: {e}")
+            return None
+    
+    def save(self, state):
+        """Atomically replace the checkpoint with state"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+    
+    def clear(self):
+        """Remove the checkpoint once the crawl has finished"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
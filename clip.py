@@ -0,0 +1,145 @@
+import re
+import sys
+from urllib.parse import urlsplit
+
+# Output key -> attribute, in the order of the output JSON
+FIELDS = {
+    "title": "title",
+    "description": "description",
+    "tags": "tags",
+    "mapID": "map_id",
+    "teamID": "team_id",
+    "agentID": "agent_id",
+    "videoURL": "video_url",
+    "thumbnailURL": "thumbnail_url",
+    "author": "author",
+    "sourceURL": "source_url"
+}
+
+# Keys written even when they are empty
+REQUIRED_KEYS = ("title", "tags")
+
+# Cloudflare Stream video ID in a player URL (iframe.videodelivery.net/<id>) or a thumbnail URL
+STREAM_ID_RE = re.compile(r"(?:videodelivery\.net|cloudflarestream\.com)/([A-Za-z0-9]+)")
+
+
+def intern(value):
+    """Share one copy of a repeated string (IDs, tags, authors) between all clips"""
+    return sys.intern(value) if value else ""
+
+
+def split_stream_url(url):
+    """Split a Cloudflare Stream URL into an interned template ("{}" for the video ID) and the video ID"""
+    stream_id_match = STREAM_ID_RE.search(url)
+    if not stream_id_match:
+        return url, ""
+    start, end = stream_id_match.span(1)
+    return sys.intern(url[:start] + "{}" + url[end:]), stream_id_match.group(1)
+
+
+class Clip:
+    """A scraped clip.
+    
+    Slots instead of a per-clip dict, and the categorical fields (tags, map,
+    team and agent IDs, author) are interned, so large result sets hold every
+    repeated string once. The player and thumbnail URLs are kept as shared
+    templates around their Cloudflare Stream video ID. to_dict() gives the output shape: title and tags
+    always, every other field only if it's not empty. get() and [] read the
+    output keys, so code written for clip dicts keeps working.
+    """
+    __slots__ = ("title", "description", "tags", "map_id", "team_id", "agent_id", "stream_id", "video_template",
+                 "thumbnail_template", "author", "source_url")
+    
+    def __init__(self, title="", description="", tags=(), map_id="", team_id="", agent_id="", video_url="",
+                 thumbnail_url="", author="", source_url=""):
+        self.title = title or ""
+        self.description = description or ""
+        self.tags = tuple(intern(tag) for tag in tags)
+        self.map_id = intern(map_id)
+        self.team_id = intern(team_id)
+        self.agent_id = intern(agent_id)
+        self.author = intern(author)
+        self.source_url = source_url or ""
+        
+        # URLs with braces are kept as they are, the templates are filled in with str.format
+        video_url, thumbnail_url = video_url or "", thumbnail_url or ""
+        self.video_template, self.thumbnail_template, self.stream_id = video_url, thumbnail_url, ""
+        if not any(brace in video_url or brace in thumbnail_url for brace in "{}"):
+            video_template, video_id = split_stream_url(video_url)
+            thumbnail_template, thumbnail_id = split_stream_url(thumbnail_url)
+            self.stream_id = video_id or thumbnail_id
+            if video_id == self.stream_id:
+                self.video_template = video_template
+            if thumbnail_id == self.stream_id:
+                self.thumbnail_template = thumbnail_template
+    
+    @property
+    def video_url(self):
+        return self.video_template.format(self.stream_id) if self.stream_id else self.video_template
+    
+    @property
+    def thumbnail_url(self):
+        return self.thumbnail_template.format(self.stream_id) if self.stream_id else self.thumbnail_template
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Build a clip from its output dict"""
+        return cls(**{attribute: data.get(key) or "" for key, attribute in FIELDS.items() if key != "tags"},
+                   tags=data.get("tags") or ())
+    
+    def to_dict(self):
+        """The clip as written to the output, empty fields left out"""
+        clip_data = {}
+        for key, attribute in FIELDS.items():
+            value = getattr(self, attribute)
+            if value or key in REQUIRED_KEYS:
+                clip_data[key] = list(value) if key == "tags" else value
+        return clip_data
+    
+    def get(self, key, default=None):
+        attribute = FIELDS.get(key)
+        if attribute is None:
+            return default
+        value = getattr(self, attribute)
+        if not value and key not in REQUIRED_KEYS:
+            return default
+        return list(value) if key == "tags" else value
+    
+    def __getitem__(self, key):
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+    
+    def __eq__(self, other):
+        if isinstance(other, (Clip, dict)):
+            return self.to_dict() == as_dict(other)
+        return NotImplemented
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"Clip({self.to_dict()!r})"
+
+
+def clip_key(clip):
+    """Stable identity of a clip (Clip or dict) across pages, runs and versions
+    
+    The sourceURL without query, fragment and trailing slash, or the Cloudflare
+    Stream video ID for clips without one. None if the clip has neither.
+    """
+    source_url = clip.get("sourceURL")
+    if source_url:
+        parts = urlsplit(source_url)
+        return f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path.rstrip('/')}"
+    
+    for key in ("videoURL", "thumbnailURL"):
+        stream_id_match = STREAM_ID_RE.search(clip.get(key) or "")
+        if stream_id_match:
+            return f"stream:{stream_id_match.group(1)}"
+    return None
+
+
+def as_dict(clip):
+    """Output dict of a Clip, dicts (e.g. clips loaded from a previous output) are passed through"""
+    return clip.to_dict() if isinstance(clip, Clip) else clip
@@ -0,0 +1,155 @@
+import numpy as np
+from clip_store import load_previous_clips
+from jsonl_sink import iter_json_lines
+from tag_classifier import AGENT_IDS, MAP_IDS, TEAM_IDS, TAG_LOOKUP, MAP, TEAM, AGENT, normalize_tag
+
+# Small int codes of the map, team and agent IDs (-1 means not set)
+FIELD_VALUES = {
+    MAP: list(MAP_IDS.values()),
+    TEAM: list(TEAM_IDS.values()),
+    AGENT: list(AGENT_IDS.values())
+}
+FIELD_CODES = {field: {value: code for code, value in enumerate(values)} for field, values in FIELD_VALUES.items()}
+
+
+def load_clips(filename):
+    """Load the clips of an export, either the JSON output or a JSON Lines stream"""
+    if filename.endswith(".jsonl"):
+        return list(iter_json_lines(filename))
+    return load_previous_clips(filename)
+
+
+class ClipColumns:
+    """A clip export in columnar form for vectorized analytics.
+
+    Tags are interned: tag_vocab holds every distinct tag once and the tags of
+    clip i are tag_ids[tag_offsets[i]:tag_offsets[i + 1]]. mapID, teamID and
+    agentID are int8 codes into FIELD_VALUES, -1 when a clip doesn't have them.
+    """
+    def __init__(self, clips):
+        self.size = len(clips)
+        self.source_urls = [clip.get("sourceURL", "") for clip in clips]
+
+        # Intern the tags in one pass over the clips
+        vocab_index = {}
+        tag_ids = []
+        lengths = np.zeros(self.size, dtype=np.int64)
+        codes = {field: np.full(self.size, -1, dtype=np.int8) for field in FIELD_VALUES}
+
+        for i, clip in enumerate(clips):
+            tags = clip.get("tags") or []
+            lengths[i] = len(tags)
+            for tag in tags:
+                tag_id = vocab_index.get(tag)
+                if tag_id is None:
+                    tag_id = vocab_index[tag] = len(vocab_index)
+                tag_ids.append(tag_id)
+
+            for field, field_codes in FIELD_CODES.items():
+                value = clip.get(field)
+                if value:
+                    codes[field][i] = field_codes.get(value, -1)
+
+        self.tag_vocab = list(vocab_index)
+        self.tag_ids = np.array(tag_ids, dtype=np.int32)
+        self.tag_offsets = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.tag_offsets[1:])
+        # Clip index of every entry in tag_ids
+        self.tag_clips = np.repeat(np.arange(self.size, dtype=np.int32), lengths)
+        self.codes = codes
+
+        # Map/team/agent lookup per vocabulary entry, so tag lists are classified with array indexing
+        self.vocab_fields = {field: np.full(len(self.tag_vocab), -1, dtype=np.int8) for field in FIELD_VALUES}
+        for tag_id, tag in enumerate(self.tag_vocab):
+            match = TAG_LOOKUP.get(normalize_tag(tag))
+            if match:
+                field, value = match
+                self.vocab_fields[field][tag_id] = FIELD_CODES[field][value]
+
+    @classmethod
+    def load(cls, filename):
+        """Build the columns of an export file"""
+        return cls(load_clips(filename))
+
+    def __len__(self):
+        return self.size
+
+    def tag_codes(self, field):
+        """Code of the first tag of every clip that names a map/team/agent (-1 if none)"""
+        entry_codes = self.vocab_fields[field][self.tag_ids]
+        matches = np.flatnonzero(entry_codes >= 0)
+
+        codes = np.full(self.size, -1, dtype=np.int8)
+        # tag_clips is sorted, so the first match of each clip is its first index
+        clips, first = np.unique(self.tag_clips[matches], return_index=True)
+        codes[clips] = entry_codes[matches[first]]
+        return codes
+
+    def classify(self):
+        """Classify the tag lists of all clips at once, like tag_classifier.classify_tags
+
+        Returns the map, team and agent codes derived from the tags, with the codes
+        already stored in the clips taking precedence, plus a mask over tag_ids of
+        the tags that remain after removing map, team and agent tags.
+        """
+        classified = {}
+        for field in FIELD_VALUES:
+            stored = self.codes[field]
+            classified[field] = np.where(stored >= 0, stored, self.tag_codes(field))
+
+        clean = np.ones(len(self.tag_ids), dtype=bool)
+        for vocab_codes in self.vocab_fields.values():
+            clean &= vocab_codes[self.tag_ids] < 0
+        return classified, clean
+
+    def code(self, field, value):
+        """Code of a map/team/agent ID, or of a tag name like "Ascent" or "attack" """
+        if value in FIELD_CODES[field]:
+            return FIELD_CODES[field][value]
+        match = TAG_LOOKUP.get(normalize_tag(value))
+        if match and match[0] == field:
+            return FIELD_CODES[field][match[1]]
+        raise ValueError(f"Unknown {field}: {value}")
+
+    def has_tag(self, *tags):
+        """Mask of the clips that have any of the tags (case-insensitive)"""
+        wanted = {normalize_tag(tag) for tag in tags}
+        vocab_ids = [tag_id for tag_id, tag in enumerate(self.tag_vocab) if normalize_tag(tag) in wanted]
+        hits = np.isin(self.tag_ids, vocab_ids)
+        return np.bincount(self.tag_clips[hits], minlength=self.size) > 0
+
+    def where(self, map_id=None, team_id=None, agent_id=None, tag=None, classify=False):
+        """Mask of the clips matching all given filters
+
+        With classify, map/team/agent filters also match clips that only carry the
+        corresponding tag (older exports kept those in the tags).
+        """
+        codes = self.classify()[0] if classify else self.codes
+        mask = np.ones(self.size, dtype=bool)
+        for field, value in ((MAP, map_id), (TEAM, team_id), (AGENT, agent_id)):
+            if value is not None:
+                mask &= codes[field] == self.code(field, value)
+        if tag is not None:
+            mask &= self.has_tag(tag)
+        return mask
+
+    def count_by(self, field, mask=None, classify=False):
+        """Number of clips per map/team/agent ID ("" counts the clips without one)"""
+        codes = self.classify()[0][field] if classify else self.codes[field]
+        if mask is not None:
+            codes = codes[mask]
+        counts = np.bincount(codes.astype(np.int64) + 1, minlength=len(FIELD_VALUES[field]) + 1)
+        values = [""] + FIELD_VALUES[field]
+        return {values[i]: int(count) for i, count in enumerate(counts) if count}
+
+    def tag_counts(self, mask=None):
+        """How often each tag occurs, most common first"""
+        tag_ids = self.tag_ids if mask is None else self.tag_ids[mask[self.tag_clips]]
+        counts = np.bincount(tag_ids, minlength=len(self.tag_vocab))
+        order = np.argsort(-counts, kind="stable")
+        return {self.tag_vocab[tag_id]: int(counts[tag_id]) for tag_id in order if counts[tag_id]}
+
+    def tags_of(self, index):
+        """Tags of a single clip"""
+        start, end = self.tag_offsets[index], self.tag_offsets[index + 1]
+        return [self.tag_vocab[tag_id] for tag_id in self.tag_ids[start:end]]
@@ -0,0 +1,151 @@
+import json
+import os
+import re
+from clip import as_dict, clip_key
+from clip_store import load_previous_output
+from output_file import atomic_output
+
+# Delta files of an output file live in output/deltas/<output name>/v<version>.json
+DELTA_DIR = "output/deltas"
+DELTA_FILE_RE = re.compile(r"^v(\d+)\.json$")
+
+
+def delta_dir(filename, root=DELTA_DIR):
+    """Directory holding the deltas of an output file"""
+    return os.path.join(root, os.path.splitext(os.path.basename(filename))[0])
+
+
+def compute_delta(previous_clips, clips, base_version, version):
+    """Delta from previous_clips (base_version) to clips (version), both Clips or dicts.
+    
+    added and changed hold the full records, removed the keys (see
+    clip.clip_key) of the clips that are gone. Reconstruction puts added clips
+    first and keeps the previous order otherwise (the listing is newest first);
+    only if the new order differs from that is the full key order stored.
+    Clips without a key and repeated keys can't be tracked; they are shipped in
+    full as positional entries ([index, record]), so apply_delta() rebuilds
+    the document exactly.
+    """
+    previous = {}
+    for clip in previous_clips:
+        key = clip_key(clip)
+        if key is not None and key not in previous:
+            previous[key] = as_dict(clip)
+    
+    added = []
+    changed = []
+    order = []
+    positional = []
+    current = set()
+    for index, clip in enumerate(clips):
+        key = clip_key(clip)
+        if key is None or key in current:
+            positional.append([index, as_dict(clip)])
+            continue
+        current.add(key)
+        order.append(key)
+        
+        clip_data = as_dict(clip)
+        if key not in previous:
+            added.append(clip_data)
+        elif previous[key] != clip_data:
+            changed.append(clip_data)
+    
+    delta = {
+        "base_version": base_version,
+        "version": version,
+        "added": added,
+        "changed": changed,
+        "removed": [key for key in previous if key not in current]
+    }
+    
+    # Only ship the order if reconstruction wouldn't produce it anyway
+    added_keys = [clip_key(clip) for clip in added]
+    if added_keys + [key for key in previous if key in current] != order:
+        delta["order"] = order
+    if positional:
+        delta["positional"] = positional
+    return delta
+
+
+def apply_delta(clips, delta):
+    """Apply a delta to the clips of its base version, returns the clips of the new version"""
+    removed = set(delta["removed"])
+    records = {}
+    previous_order = []
+    for clip in clips:
+        clip_data = as_dict(clip)
+        key = clip_key(clip_data)
+        if key is not None and key not in removed and key not in records:
+            records[key] = clip_data
+            previous_order.append(key)
+    
+    added_keys = []
+    for clip_data in delta["added"]:
+        key = clip_key(clip_data)
+        records[key] = clip_data
+        added_keys.append(key)
+    for clip_data in delta["changed"]:
+        records[clip_key(clip_data)] = clip_data
+    
+    order = delta.get("order") or added_keys + previous_order
+    clips = [records[key] for key in order]
+    
+    # The untracked clips go back to their positions, in ascending order
+    for index, clip_data in delta.get("positional", []):
+        clips.insert(index, clip_data)
+    return clips
+
+
+def checked_delta(filename, previous_clips, clips, base_version, version):
+    """compute_delta, checked to rebuild clips from previous_clips (ValueError if it doesn't)"""
+    delta = compute_delta(previous_clips, clips, base_version, version)
+    
+    # Never ship a delta that doesn't rebuild the document
+    if apply_delta(previous_clips, delta) != [as_dict(clip) for clip in clips]:
+        raise ValueError(f"Delta v{base_version} -> v{version} of {filename} doesn't reconstruct the document")
+    return delta
+
+
+def write_delta(filename, delta, root=DELTA_DIR):
+    """Atomically write a delta (see checked_delta) of an output file to its delta directory"""
+    with atomic_output(os.path.join(delta_dir(filename, root), f"v{delta['version']}.json")) as f:
+        json.dump(delta, f, ensure_ascii=False, separators=(",", ":"))
+    
+    print(f"Delta v{delta['base_version']} -> v{delta['version']}: {len(delta['added'])} added, "
+          f"{len(delta['changed'])} changed, {len(delta['removed'])} removed")
+
+
+def load_deltas(directory):
+    """All deltas in a delta directory, by version"""
+    deltas = {}
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if DELTA_FILE_RE.match(name):
+                with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                    delta = json.load(f)
+                deltas[delta["version"]] = delta
+    return deltas
+
+
+def reconstruct(base_filename, directory, version=None):
+    """Rebuild the clips of a version from a full base document plus the deltas after it.
+    
+    base_filename is any earlier versioned output (e.g. the copy a consumer
+    synced last time); version defaults to the newest delta. Raises ValueError
+    if the chain of deltas from the base to version has a gap.
+    """
+    base_version, clips = load_previous_output(base_filename)
+    deltas = load_deltas(directory)
+    if version is None:
+        version = max(deltas, default=base_version)
+    
+    current_version = base_version
+    while current_version < version:
+        delta = next((delta for delta in deltas.values() if delta["base_version"] == current_version), None)
+        if delta is None or delta["version"] > version:
+            raise ValueError(f"No delta from version {current_version} towards version {version} in {directory}")
+        clips = apply_delta(clips, delta)
+        current_version = delta["version"]
+    
+    return clips
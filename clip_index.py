@@ -0,0 +1,105 @@
+import json
+import os
+import sqlite3
+from clip import as_dict, clip_key
+
+class ClipIndex:
+    """On-disk index of the latest record of every clip, keyed by clip.clip_key.
+    
+    Every update() is a new version. Clips of an update replace their previous
+    record or are added, all other clips are kept, so an incremental crawl is
+    merged into the data instead of replacing it. After a full crawl, prune()
+    drops the clips that weren't seen anymore. records() yields the clips of
+    the newest version first, in crawl order.
+    """
+    def __init__(self, path="output/clip_index.sqlite"):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS clips ("
+            "key TEXT PRIMARY KEY, record TEXT NOT NULL, first_version INTEGER, changed_version INTEGER, "
+            "last_version INTEGER, position INTEGER)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS clips_order ON clips (last_version, position)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+        self.db.commit()
+    
+    @property
+    def version(self):
+        """Version of the last update, 0 for an empty index"""
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        return row[0] if row else 0
+    
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM clips").fetchone()[0]
+    
+    def get(self, key):
+        """Latest record of a clip, None if it isn't indexed"""
+        row = self.db.execute("SELECT record FROM clips WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def update(self, clips):
+        """Merge the clips of a crawl (Clips or dicts) into the index as a new version.
+        
+        A clip seen twice in the same update keeps its first position and its
+        latest record. Returns the number of added, changed, unchanged and
+        unkeyed (not indexable) clips.
+        """
+        version = self.version + 1
+        stats = {"added": 0, "changed": 0, "unchanged": 0, "unkeyed": 0}
+        
+        with self.db:
+            for position, clip in enumerate(clips):
+                key = clip_key(clip)
+                if key is None:
+                    stats["unkeyed"] += 1
+                    continue
+                
+                clip_data = as_dict(clip)
+                record = json.dumps(clip_data, ensure_ascii=False)
+                row = self.db.execute("SELECT record, last_version FROM clips WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    stats["added"] += 1
+                    self.db.execute(
+                        "INSERT INTO clips (key, record, first_version, changed_version, last_version, position) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, record, version, version, version, position)
+                    )
+                elif row[1] == version:
+                    # Duplicate within this update (listing drift), keep the first position
+                    self.db.execute("UPDATE clips SET record = ? WHERE key = ?", (record, key))
+                elif json.loads(row[0]) != clip_data:
+                    stats["changed"] += 1
+                    self.db.execute(
+                        "UPDATE clips SET record = ?, changed_version = ?, last_version = ?, position = ? WHERE key = ?",
+                        (record, version, version, position, key)
+                    )
+                else:
+                    stats["unchanged"] += 1
+                    self.db.execute(
+                        "UPDATE clips SET last_version = ?, position = ? WHERE key = ?",
+                        (version, position, key)
+                    )
+            
+            self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (version,))
+        
+        return stats
+    
+    def prune(self):
+        """Remove the clips not seen in the last update, returns their keys"""
+        version = self.version
+        with self.db:
+            removed = [row[0] for row in self.db.execute("SELECT key FROM clips WHERE last_version < ?", (version,))]
+            self.db.execute("DELETE FROM clips WHERE last_version < ?", (version,))
+        return removed
+    
+    def records(self):
+        """Yield the latest record of every clip, newest version first and in crawl order"""
+        for (record,) in self.db.execute("SELECT record FROM clips ORDER BY last_version DESC, position"):
+            yield json.loads(record)
+    
+    def close(self):
+        self.db.close()
@@ -0,0 +1,72 @@
+import json
+import os
+from clip import clip_key
+from output_file import open_output
+
+def load_previous_output(filename):
+    """Load the version and the clips of a previous output file.
+
+    Handles both the versioned {"version", "data"} document and a plain list of
+    clips (version 0). Returns (0, []) if the file doesn't exist or can't be read.
+    """
+    if not os.path.exists(filename):
+        return 0, []
+    
+    try:
+        with open_output(filename) as f:
+            existing_data = json.load(f)
+    except Exception as e:
+        print(f"Error reading existing file: {e}")
+        return 0, []
+    
+    if isinstance(existing_data, dict):
+        return existing_data.get("version", 0), existing_data.get("data") or []
+    return 0, existing_data
+
+
+def load_previous_clips(filename):
+    """Load the clips of a previous output file, an empty list if there is none"""
+    return load_previous_output(filename)[1]
+
+
+def load_known_keys(filename):
+    """Return the keys (see clip.clip_key) of the clips already present in a previous output file"""
+    keys = {clip_key(clip) for clip in load_previous_clips(filename)}
+    keys.discard(None)
+    return keys
+
+
+def merge_clips(new_clips, previous_clips):
+    """Merge newly scraped clips into the previous ones.
+
+    New clips come first (the listing is newest first); previous clips are kept
+    unless a new clip with the same key (see clip.clip_key) replaces them.
+    """
+    new_keys = {clip_key(clip) for clip in new_clips}
+    new_keys.discard(None)
+    return list(new_clips) + [clip for clip in previous_clips if clip_key(clip) not in new_keys]
+
+
+class SeenClips:
+    """Keys of the clips collected so far in a crawl.
+    
+    The listing shifts while a long crawl runs, so the same clip can show up on
+    two pages; filter() only lets its first occurrence through.
+    """
+    def __init__(self, clips=()):
+        self.keys = set()
+        self.duplicates = 0
+        self.filter(clips)
+    
+    def filter(self, clips, key_func=clip_key):
+        """Return the clips that weren't seen yet and remember them, key_func gives the key of a clip"""
+        new_clips = []
+        for clip in clips:
+            key = key_func(clip)
+            if key is not None:
+                if key in self.keys:
+                    self.duplicates += 1
+                    continue
+                self.keys.add(key)
+            new_clips.append(clip)
+        return new_clips
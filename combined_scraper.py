@@ -1,14 +1,39 @@
 import os
 import sys
-import json
 import time
 import subprocess
+import threading
+from concurrent.futures import Future, wait
+from jsonl_sink import write_clips_json
+from clip_store import SeenClips, load_previous_output
+from clip_delta import checked_delta, write_delta
+
+# Scraper class per backend, imported lazily, in order of preference on equal probe times
+BACKENDS = {
+    "api": ("api_scraper", "ApiScraper"),
+    "tracker": ("tracker_scraper", "TrackerScraper"),
+    "selenium": ("selenium_scraper", "SeleniumTrackerScraper")
+}
+
+# Seconds the backends get to scrape the first page in the probe
+PROBE_DEADLINE = 60
 
 def install_requirements():
     """Install required packages from requirements.txt"""
     print("Installing required packages...")
     subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
 
+def save_results(output_file, results):
+    """Write the next version of an output file plus a delta against the previous version, returns the version"""
+    previous_version, previous_clips = load_previous_output(output_file)
+    version = previous_version + 1
+    
+    # Check the delta before anything is written, so a bad one never leaves a document without its delta
+    delta = checked_delta(output_file, previous_clips, results, previous_version, version)
+    write_clips_json(output_file, results, version)
+    write_delta(output_file, delta)
+    return version
+
 def run_tracker_scraper(start_page=1, max_pages=None):
     """Run the tracker.gg scraper"""
     try:
@@ -35,8 +60,8 @@ def run_selenium_scraper(start_page=1, max_pages=None):
     """Run the Selenium scraper"""
     try:
         print("Running Selenium scraper...")
-        from selenium_scraper import SeleniumScraper
-        scraper = SeleniumScraper()
+        from selenium_scraper import SeleniumTrackerScraper
+        scraper = SeleniumTrackerScraper()
         scraper.scrape(start_page, max_pages)
         
         # Check if we have any results
@@ -75,53 +100,207 @@ def run_api_scraper(start_page=1, max_pages=None):
         print(f"Error running API scraper: {e}")
         return None
 
-def run_combined_scraper(start_page=1, max_pages=None, output_file="valorant_clips.json"):
-    """Run all scrapers and combine the results"""
-    # Try API scraper first
-    api_results = run_api_scraper(start_page, max_pages)
+def create_backend(method, scraper_kwargs=None):
+    """Create the scraper of a backend ("api", "tracker" or "selenium")"""
+    module_name, class_name = BACKENDS[method]
+    module = __import__(module_name)
+    return getattr(module, class_name)(**(scraper_kwargs or {}))
+
+def close_backend(scraper):
+    """Release what a backend holds open (the browsers of the Selenium scraper)"""
+    pool = getattr(scraper, "pool", None)
+    if pool is not None:
+        pool.close()
+
+def probe_backend(method, page_num, scraper_kwargs=None):
+    """Create a backend and scrape page_num with it, returns (scraper, page, seconds)
+    
+    page is the (clips, has_next) of scrape_page, None if the backend failed.
+    """
+    start_time = time.time()
+    scraper = create_backend(method, scraper_kwargs)
+    try:
+        page = scraper.scrape_page(page_num)
+    except Exception as e:
+        print(f"The {method} backend failed on page {page_num}: {e}")
+        page = None
+    
+    if page is None:
+        close_backend(scraper)
+    return scraper, page, time.time() - start_time
+
+def run_probe(future, method, page_num, scraper_kwargs=None):
+    """Run probe_backend and put its result (or exception) into future"""
+    try:
+        future.set_result(probe_backend(method, page_num, scraper_kwargs))
+    except Exception as e:
+        future.set_exception(e)
+
+def close_late_probe(future):
+    """Close the backend of a probe that finished after the deadline"""
+    if future.exception() is None:
+        close_backend(future.result()[0])
+
+def probe_backends(methods, page_num, deadline=PROBE_DEADLINE, scraper_kwargs=None):
+    """Scrape page_num with every backend concurrently, returns the healthy ones fastest first
+    
+    A backend is healthy if it returned clips within deadline seconds. Returns
+    [(method, scraper, page), ...] so the winner's page doesn't have to be
+    scraped again. scraper_kwargs maps a method to the keyword arguments of its
+    scraper (e.g. the base_url of a replay server).
+    
+    The probes run on daemon threads, so a probe that hangs (e.g. a stuck
+    browser) doesn't keep the process alive after the crawl.
+    """
+    scraper_kwargs = scraper_kwargs or {}
+    futures = {}
+    for method in methods:
+        future = Future()
+        threading.Thread(target=run_probe, args=(future, method, page_num, scraper_kwargs.get(method)),
+                         daemon=True).start()
+        futures[future] = method
+    done, late = wait(futures, timeout=deadline)
+    
+    # Don't wait for the late probes, their backends are closed when they finish
+    for future in late:
+        print(f"The {futures[future]} backend missed the {deadline}s probe deadline")
+        future.add_done_callback(close_late_probe)
     
-    # If API scraper failed, try tracker.gg scraper
-    if not api_results:
-        tracker_results = run_tracker_scraper(start_page, max_pages)
+    healthy = []
+    for future in done:
+        method = futures[future]
+        try:
+            scraper, page, seconds = future.result()
+        except Exception as e:
+            print(f"Could not start the {method} backend: {e}")
+            continue
         
-        # If tracker.gg scraper failed, try Selenium scraper
-        if not tracker_results:
-            selenium_results = run_selenium_scraper(start_page, max_pages)
-            
-            # If all scrapers failed, return None
-            if not selenium_results:
-                print("All scrapers failed")
-                return None
-            
-            # Use Selenium results
-            results = selenium_results
-        else:
-            # Use tracker.gg results
-            results = tracker_results
-    else:
-        # Use API results
-        results = api_results
+        if page is None:
+            continue
+        if not page[0]:
+            print(f"The {method} backend found no clips on page {page_num}")
+            close_backend(scraper)
+            continue
+        
+        print(f"The {method} backend found {len(page[0])} clips on page {page_num} in {seconds:.1f}s")
+        healthy.append((seconds, list(BACKENDS).index(method), method, scraper, page))
+    
+    healthy.sort(key=lambda probe: probe[:2])
+    return [(method, scraper, page) for _, _, method, scraper, page in healthy]
+
+def scrape_with_fallback(backends, page_num):
+    """Scrape a page with the first backend that finds clips on it, returns (method, page) or None
     
-    # Check if the file already exists and get the current version
-    version = 1
-    if os.path.exists(output_file):
+    backends is the [(method, scraper), ...] ranking. A backend that fails or
+    finds nothing is moved to the end, so the next one takes over the crawl.
+    If no backend finds clips the first empty page is returned (the end of the
+    listing), None if they all failed.
+    """
+    empty_page = None
+    for _ in range(len(backends)):
+        method, scraper = backends[0]
         try:
-            with open(output_file, "r", encoding="utf-8") as f:
-                existing_data = json.load(f)
-                if "version" in existing_data:
-                    version = existing_data["version"] + 1
+            page = scraper.scrape_page(page_num)
         except Exception as e:
-            print(f"Error reading existing file: {e}")
+            print(f"The {method} backend failed on page {page_num}: {e}")
+            page = None
+        
+        if page is not None and page[0]:
+            return method, page
+        if page is not None and empty_page is None:
+            empty_page = (method, page)
+        
+        # Hot switch: the next backend continues from this page
+        backends.append(backends.pop(0))
     
-    # Create the structured output with version and data
-    output_data = {
-        "version": version,
-        "data": results
-    }
+    return empty_page
+
+def run_racing_scraper(start_page=1, max_pages=None, methods=tuple(BACKENDS), deadline=PROBE_DEADLINE,
+                       scraper_kwargs=None):
+    """Scrape with the fastest healthy backend, switching backends per page when one fails
     
-    # Save the results to a JSON file
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, indent=4, ensure_ascii=False)
+    All backends scrape start_page concurrently (see probe_backends) and the
+    crawl continues on the fastest healthy one. A page it fails on is retried
+    on the next backend in the ranking, which takes over from there, so a late
+    failure doesn't restart the crawl. The clips of all backends are merged
+    into one list without duplicates. Returns None if no backend was healthy.
+    
+    Pages are scraped with scrape_page, not scrape(), so there is no
+    incremental stop (known_threshold) and no checkpoint to resume from.
+    """
+    print(f"Probing the {', '.join(methods)} backends on page {start_page}...")
+    probes = probe_backends(methods, start_page, deadline, scraper_kwargs)
+    if not probes:
+        print("All scrapers failed")
+        return None
+    
+    backends = [(method, scraper) for method, scraper, _ in probes]
+    method, _, page = probes[0]
+    print(f"Scraping with the {method} backend")
+    
+    results = []
+    seen = SeenClips()
+    pages_by_backend = {}
+    current_method = method
+    page_num = start_page
+    
+    try:
+        while True:
+            # The first page was already scraped by the probe
+            if page is None:
+                scraped = scrape_with_fallback(backends, page_num)
+                if scraped is None:
+                    print(f"All backends failed on page {page_num}, stopping")
+                    break
+                method, page = scraped
+            
+            if method != current_method:
+                print(f"Switched from the {current_method} to the {method} backend on page {page_num}")
+                current_method = method
+            
+            page_results, has_next = page
+            page = None
+            pages_by_backend[method] = pages_by_backend.get(method, 0) + 1
+            results.extend(seen.filter(page_results))
+            print(f"Found {len(page_results)} clips on page {page_num} ({method})")
+            
+            # If no results were found on this page, we've reached the end
+            if len(page_results) == 0:
+                print("No more clips found, stopping.")
+                break
+            
+            # A disabled next button means this was the last page
+            if has_next is False:
+                print("Reached the last page, stopping.")
+                break
+            
+            # Check if we should stop based on max_pages
+            if max_pages and page_num >= start_page + max_pages - 1:
+                break
+            
+            page_num += 1
+    finally:
+        for _, scraper in backends:
+            close_backend(scraper)
+    
+    print(f"Pages per backend: {pages_by_backend}")
+    if seen.duplicates > 0:
+        print(f"Dropped {seen.duplicates} duplicate clips repeated by the shifting listing")
+    
+    return results
+
+def run_combined_scraper(start_page=1, max_pages=None, output_file="valorant_clips.json"):
+    """Run all scrapers and combine the results
+    
+    The backends race on the first page and hand over pages to each other when
+    one fails (see run_racing_scraper).
+    """
+    results = run_racing_scraper(start_page, max_pages)
+    if not results:
+        return None
+    
+    # Save the next version and the delta from the previous one
+    version = save_results(output_file, results)
     
     print(f"Saved {len(results)} clips to {output_file} (version {version})")
     
@@ -144,50 +323,12 @@ def run_full_scraper(method, start_page=1, max_pages=None):
     # Save the results
     output_file = f"output/tracker_clips_{method}.json"
     
-    # Check if the file already exists and get the current version
-    version = 1
-    if os.path.exists(output_file):
-        try:
-            with open(output_file, "r", encoding="utf-8") as f:
-                existing_data = json.load(f)
-                if "version" in existing_data:
-                    version = existing_data["version"] + 1
-        except Exception as e:
-            print(f"Error reading existing file: {e}")
-    
-    # Create the structured output with version and data
-    output_data = {
-        "version": version,
-        "data": results
-    }
-    
-    # Save the results to a JSON file
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, indent=4, ensure_ascii=False)
+    # Save the next version and the delta from the previous one
+    save_results(output_file, results)
     
-    # Copy to the main output file
+    # Copy to the main output file (it has its own versions and deltas)
     main_output_file = "output/tracker_clips.json"
-    
-    # Check if the main output file already exists and get the current version
-    main_version = 1
-    if os.path.exists(main_output_file):
-        try:
-            with open(main_output_file, "r", encoding="utf-8") as f:
-                existing_data = json.load(f)
-                if "version" in existing_data:
-                    main_version = existing_data["version"] + 1
-        except Exception as e:
-            print(f"Error reading existing main output file: {e}")
-    
-    # Create the structured output with version and data
-    main_output_data = {
-        "version": main_version,
-        "data": results
-    }
-    
-    # Save the results to the main output file
-    with open(main_output_file, "w", encoding="utf-8") as f:
-        json.dump(main_output_data, f, indent=4, ensure_ascii=False)
+    main_version = save_results(main_output_file, results)
     
     print(f"Saved {len(results)} clips to {main_output_file} (version {main_version})")
 
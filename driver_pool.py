@@ -0,0 +1,218 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from webdriver_manager.chrome import ChromeDriverManager
+
+# Resolved chromedriver binary, so webdriver-manager isn't consulted on every run
+DRIVER_PATH_CACHE = "output/chromedriver_path.txt"
+
+# Network.setBlockedURLs wildcard patterns of the resources the scraper never looks at, we only read
+# the src attributes of thumbnails and players, not their content
+BLOCKED_RESOURCES = {
+    "image": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.m4s*", "*.mp3*", "*videodelivery.net/*", "*cloudflarestream.com/*"]
+}
+
+# Bytes transferred by the current page (document and subresources) and its load time
+PAGE_METRICS_SCRIPT = """
+const navigation = performance.getEntriesByType("navigation")[0];
+const resources = performance.getEntriesByType("resource");
+let transferred = navigation ? navigation.transferSize : 0;
+for (const resource of resources) {
+    transferred += resource.transferSize;
+}
+return {
+    transferred: transferred,
+    requests: resources.length + 1,
+    load_ms: navigation ? navigation.domContentLoadedEventEnd - navigation.startTime : 0
+};
+"""
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def resolve_driver_path(refresh=False):
+    """Return the chromedriver path, resolving it with webdriver-manager only when not cached"""
+    if not refresh and os.path.exists(DRIVER_PATH_CACHE):
+        with open(DRIVER_PATH_CACHE, "r", encoding="utf-8") as f:
+            driver_path = f.read().strip()
+        if driver_path and os.path.exists(driver_path):
+            return driver_path
+    
+    driver_path = ChromeDriverManager().install()
+    os.makedirs(os.path.dirname(DRIVER_PATH_CACHE), exist_ok=True)
+    with open(DRIVER_PATH_CACHE, "w", encoding="utf-8") as f:
+        f.write(driver_path)
+    return driver_path
+
+
+def blocked_url_patterns(allow=()):
+    """URL patterns to block, allow lists resource types ("image", "font", "media") or patterns to keep loading"""
+    allow = set(allow)
+    return [
+        pattern
+        for resource_type, patterns in BLOCKED_RESOURCES.items() if resource_type not in allow
+        for pattern in patterns if pattern not in allow
+    ]
+
+
+def page_metrics(driver):
+    """Transferred bytes, request count and load time of the page a driver has loaded"""
+    try:
+        return driver.execute_script(PAGE_METRICS_SCRIPT) or {}
+    except WebDriverException:
+        return {}
+
+
+def chrome_options(headless=True):
+    """Chrome options used by the scraper"""
+    options = Options()
+    # Return from driver.get() once the DOM is ready instead of waiting for every subresource
+    options.page_load_strategy = "eager"
+    if headless:
+        options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--start-maximized")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    return options
+
+
+def create_driver(headless=True, block_resources=True, allow=()):
+    """Start a Chrome driver with the scraper's options and user agent
+    
+    With block_resources, images, fonts and media are never downloaded (see
+    BLOCKED_RESOURCES), except for the resource types and patterns in allow.
+    """
+    try:
+        driver = webdriver.Chrome(service=Service(resolve_driver_path()), options=chrome_options(headless))
+    except WebDriverException:
+        # The cached binary may not match an updated Chrome anymore, resolve it again
+        driver = webdriver.Chrome(service=Service(resolve_driver_path(refresh=True)), options=chrome_options(headless))
+    
+    # Set user agent
+    driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": USER_AGENT})
+    
+    if block_resources:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {"urls": blocked_url_patterns(allow)})
+    return driver
+
+
+class DriverPool:
+    """A pool of warm Chrome drivers handed out to concurrent page loads.
+    
+    Drivers are recycled (quit and replaced) after recycle_after pages to keep
+    memory in check, and replaced right away when they crash. A slot whose
+    replacement fails to start stays in the pool empty and is started again
+    when it is borrowed. Borrowing waits at most acquire_timeout seconds.
+    """
+    def __init__(self, size=1, headless=True, recycle_after=50, driver_factory=None, block_resources=True, allow=(),
+                 acquire_timeout=300):
+        self.size = size
+        self.recycle_after = recycle_after
+        self.acquire_timeout = acquire_timeout
+        self.driver_factory = driver_factory or (lambda: create_driver(headless, block_resources, allow))
+        self.available = queue.Queue()
+        self.page_counts = {}
+        self.lock = threading.Lock()
+        self.recycled = 0
+        
+        # Start the browsers in parallel, Chrome startup dominates otherwise
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            futures = [executor.submit(self.driver_factory) for _ in range(size)]
+        
+        # If one fails to start, quit the ones that did instead of leaking them
+        failed = next((future.exception() for future in futures if future.exception()), None)
+        if failed:
+            for future in futures:
+                if not future.exception():
+                    self.discard(future.result())
+            raise failed
+        for future in futures:
+            self.add(future.result())
+    
+    def add(self, driver):
+        with self.lock:
+            self.page_counts[driver] = 0
+        self.available.put(driver)
+    
+    def discard(self, driver):
+        """Quit a driver and forget about it"""
+        with self.lock:
+            self.page_counts.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    
+    def replace(self, driver):
+        """Quit a driver and put a fresh one into the pool (an empty slot if it doesn't start)"""
+        self.discard(driver)
+        with self.lock:
+            self.recycled += 1
+        try:
+            self.add(self.driver_factory())
+        except Exception as e:
+            print(f"Could not start a replacement driver, retrying on the next page: {e}")
+            self.available.put(None)
+    
+    def acquire(self):
+        """Take a driver from the pool, starting one in an empty slot"""
+        try:
+            driver = self.available.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutException(f"No driver available after {self.acquire_timeout}s")
+        if driver is not None:
+            return driver
+        
+        try:
+            driver = self.driver_factory()
+        except Exception as e:
+            # Keep the slot, another page may have more luck
+            self.available.put(None)
+            raise WebDriverException(f"Could not start a driver: {e}") from e
+        with self.lock:
+            self.page_counts[driver] = 0
+        return driver
+    
+    @contextmanager
+    def driver(self):
+        """Borrow a driver for one page"""
+        driver = self.acquire()
+        try:
+            yield driver
+        except WebDriverException as e:
+            if not isinstance(e, TimeoutException):
+                # The browser crashed or lost its session, don't hand it out again
+                print(f"Replacing crashed driver: {e.__class__.__name__}")
+                self.replace(driver)
+                driver = None
+            raise
+        finally:
+            if driver is not None:
+                with self.lock:
+                    self.page_counts[driver] += 1
+                    worn_out = self.page_counts[driver] >= self.recycle_after
+                if worn_out:
+                    self.replace(driver)
+                else:
+                    self.available.put(driver)
+    
+    def close(self):
+        """Quit all drivers"""
+        while not self.available.empty():
+            driver = self.available.get()
+            if driver is not None:
+                self.discard(driver)
@@ -0,0 +1,327 @@
+import re
+from bs4 import BeautifulSoup
+import soupsieve
+
+# Optional faster backends
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxHTMLParser
+except ImportError:
+    try:
+        # selectolax < 0.3.13 only ships the modest engine
+        from selectolax.parser import HTMLParser as SelectolaxHTMLParser
+    except ImportError:
+        SelectolaxHTMLParser = None
+
+# CSS selectors for the guide-tile markup on the listing and clip detail pages
+SELECTORS = {
+    "tile": "div.guide-tile",
+    "title": "p.guide-tile__title",
+    "badges": "div.guide-tile__badges",
+    "badge": "span.badge",
+    "video": "div.guide-tile__video",
+    "author": "span.guide-tile__author",
+    "tile_video": "iframe, video",
+    "button": "button",
+    "page_link": "button, a",
+    "detail_iframe": 'iframe[src*="videodelivery.net"]',
+    "detail_video": 'video[src*="cloudflarestream"]'
+}
+
+PAGE_NUMBER_RE = re.compile(r"^\s*\d+\s*$")
+
+# Cloudflare Stream thumbnails look like https://<customer>.cloudflarestream.com/<video id>/thumbnails/...
+THUMBNAIL_VIDEO_ID_RE = re.compile(r'cloudflarestream\.com/([^/]+)/')
+
+
+def clean_author(author_text, author_link_text=None):
+    """Turn the "By <name>" author line of a tile into the author name"""
+    author = ""
+    if "By" in author_text:
+        author = author_text.replace("By", "").strip()
+        # If there's an anchor tag, use that text instead
+        if author_link_text is not None:
+            author = author_link_text.strip()
+    return author
+
+
+def thumbnail_video_url(thumbnail_url):
+    """Derive the iframe video URL from a cloudflarestream thumbnail URL, "" if it has no video ID"""
+    video_id_match = THUMBNAIL_VIDEO_ID_RE.search(thumbnail_url or "")
+    if video_id_match:
+        return f"https://iframe.videodelivery.net/{video_id_match.group(1)}"
+    return ""
+
+
+def is_current_page(attributes):
+    """Check whether a pagination element is marked as the current page"""
+    classes = (attributes.get("class") or "").split()
+    return attributes.get("aria-current") == "page" or "active" in classes or "current" in classes
+
+
+class ListingPage:
+    """A listing page parsed once: clip tiles, next button state and pagination
+    
+    Every tile is a dict with the raw title, href, tags, thumbnail_url, author
+    and video_url of a guide tile. video_url is only set on rendered pages
+    (Selenium), where the tile embeds its player.
+    """
+    def __init__(self, tiles, next_button=None, page_numbers=None, current_page=None):
+        self.tiles = tiles
+        # None if there is no next button, otherwise whether it is enabled
+        self.next_button = next_button
+        self.page_numbers = page_numbers or []
+        self.current_page = current_page
+    
+    @property
+    def has_next(self):
+        """True/False from the next button, None if the page has no next button at all"""
+        return self.next_button
+    
+    @property
+    def total_pages(self):
+        """Highest page number shown in the pagination, None if there is none"""
+        return max(self.page_numbers) if self.page_numbers else None
+
+
+class SoupParser:
+    """BeautifulSoup backend with precompiled soupsieve selectors.
+    
+    features selects the tree builder: "html.parser" (pure Python, always
+    available) or "lxml".
+    """
+    def __init__(self, features="html.parser"):
+        self.name = features
+        self.features = features
+        self.selectors = {key: soupsieve.compile(selector) for key, selector in SELECTORS.items()}
+    
+    def make_soup(self, html_content):
+        return BeautifulSoup(html_content or "", self.features)
+    
+    def parse_tile(self, clip_element):
+        select_one = lambda key, element: self.selectors[key].select_one(element)
+        
+        title_element = select_one("title", clip_element)
+        title_link = title_element.find("a") if title_element else None
+        
+        badges_element = select_one("badges", clip_element)
+        tags = [badge.text.strip() for badge in self.selectors["badge"].select(badges_element)] if badges_element else []
+        
+        video_div = select_one("video", clip_element)
+        img_element = video_div.find("img") if video_div else None
+        player = select_one("tile_video", clip_element)
+        
+        author_element = select_one("author", clip_element)
+        author = ""
+        if author_element:
+            author_link = author_element.find("a")
+            author = clean_author(author_element.text.strip(), author_link.text if author_link else None)
+        
+        return {
+            "title": title_link.text.strip() if title_link else "",
+            "href": title_link.get("href", "") if title_link else "",
+            "tags": tags,
+            "thumbnail_url": img_element.get("src", "") if img_element else "",
+            "author": author,
+            "video_url": (player.get("src") or player.get("data-src") or "") if player else ""
+        }
+    
+    def parse_listing(self, html_content):
+        soup = self.make_soup(html_content)
+        tiles = [self.parse_tile(clip_element) for clip_element in self.selectors["tile"].select(soup)]
+        
+        next_button = None
+        for button in self.selectors["button"].select(soup):
+            if button.string and "Next" in button.string:
+                # A bare "disabled" attribute has an empty value, so check for its presence
+                next_button = not button.has_attr("disabled")
+                break
+        
+        page_numbers = []
+        current_page = None
+        for element in self.selectors["page_link"].select(soup):
+            if element.string and PAGE_NUMBER_RE.match(element.string):
+                number = int(element.string)
+                page_numbers.append(number)
+                if is_current_page({"class": " ".join(element.get("class", [])), "aria-current": element.get("aria-current")}):
+                    current_page = number
+        
+        return ListingPage(tiles, next_button, page_numbers, current_page)
+    
+    def parse_detail(self, html_content):
+        soup = self.make_soup(html_content)
+        for key in ("detail_iframe", "detail_video"):
+            element = self.selectors[key].select_one(soup)
+            if element and element.get("src"):
+                return element["src"]
+        return ""
+
+
+class LxmlParser:
+    """lxml backend using precompiled XPath expressions"""
+    name = "lxml"
+    
+    def __init__(self):
+        has_class = lambda name: f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+        self.tiles = etree.XPath(f"//div[{has_class('guide-tile')}]")
+        self.title_link = etree.XPath(f"(.//p[{has_class('guide-tile__title')}])[1]/descendant::a[1]")
+        self.badges = etree.XPath(f"(.//div[{has_class('guide-tile__badges')}])[1]//span[{has_class('badge')}]")
+        self.thumbnail = etree.XPath(f"(.//div[{has_class('guide-tile__video')}])[1]/descendant::img[1]")
+        self.author = etree.XPath(f"(.//span[{has_class('guide-tile__author')}])[1]")
+        self.author_link = etree.XPath("descendant::a[1]")
+        self.player = etree.XPath("(.//iframe | .//video)[1]")
+        self.next_buttons = etree.XPath("//button[contains(text(), 'Next')]")
+        self.page_links = etree.XPath("//button | //a")
+        self.detail_iframe = etree.XPath("//iframe[contains(@src, 'videodelivery.net')]/@src")
+        self.detail_video = etree.XPath("//video[contains(@src, 'cloudflarestream')]/@src")
+    
+    def parse_tree(self, html_content):
+        if not html_content or not html_content.strip():
+            return None
+        return lxml.html.document_fromstring(html_content)
+    
+    def parse_tile(self, clip_element):
+        title_link = self.title_link(clip_element)
+        thumbnail = self.thumbnail(clip_element)
+        author_element = self.author(clip_element)
+        player = self.player(clip_element)
+        
+        author = ""
+        if author_element:
+            author_link = self.author_link(author_element[0])
+            author = clean_author(author_element[0].text_content().strip(),
+                                  author_link[0].text_content() if author_link else None)
+        
+        return {
+            "title": title_link[0].text_content().strip() if title_link else "",
+            "href": title_link[0].get("href", "") if title_link else "",
+            "tags": [badge.text_content().strip() for badge in self.badges(clip_element)],
+            "thumbnail_url": thumbnail[0].get("src", "") if thumbnail else "",
+            "author": author,
+            "video_url": (player[0].get("src") or player[0].get("data-src") or "") if player else ""
+        }
+    
+    def parse_listing(self, html_content):
+        tree = self.parse_tree(html_content)
+        if tree is None:
+            return ListingPage([])
+        
+        tiles = [self.parse_tile(clip_element) for clip_element in self.tiles(tree)]
+        
+        next_buttons = self.next_buttons(tree)
+        next_button = ("disabled" not in next_buttons[0].attrib) if next_buttons else None
+        
+        page_numbers = []
+        current_page = None
+        for element in self.page_links(tree):
+            if len(element) == 0 and element.text and PAGE_NUMBER_RE.match(element.text):
+                number = int(element.text)
+                page_numbers.append(number)
+                if is_current_page(element.attrib):
+                    current_page = number
+        
+        return ListingPage(tiles, next_button, page_numbers, current_page)
+    
+    def parse_detail(self, html_content):
+        tree = self.parse_tree(html_content)
+        if tree is None:
+            return ""
+        sources = self.detail_iframe(tree) or self.detail_video(tree)
+        return sources[0] if sources else ""
+
+
+class SelectolaxParser:
+    """selectolax (lexbor/modest) backend, the fastest of the three"""
+    name = "selectolax"
+    
+    def parse_tile(self, clip_element):
+        title_element = clip_element.css_first(SELECTORS["title"])
+        title_link = title_element.css_first("a") if title_element else None
+        
+        badges_element = clip_element.css_first(SELECTORS["badges"])
+        tags = [badge.text().strip() for badge in badges_element.css(SELECTORS["badge"])] if badges_element else []
+        
+        video_div = clip_element.css_first(SELECTORS["video"])
+        img_element = video_div.css_first("img") if video_div else None
+        player = clip_element.css_first(SELECTORS["tile_video"])
+        
+        author_element = clip_element.css_first(SELECTORS["author"])
+        author = ""
+        if author_element:
+            author_link = author_element.css_first("a")
+            author = clean_author(author_element.text().strip(), author_link.text() if author_link else None)
+        
+        return {
+            "title": title_link.text().strip() if title_link else "",
+            "href": (title_link.attributes.get("href") or "") if title_link else "",
+            "tags": tags,
+            "thumbnail_url": (img_element.attributes.get("src") or "") if img_element else "",
+            "author": author,
+            "video_url": (player.attributes.get("src") or player.attributes.get("data-src") or "") if player else ""
+        }
+    
+    def parse_listing(self, html_content):
+        tree = SelectolaxHTMLParser(html_content or "")
+        tiles = [self.parse_tile(clip_element) for clip_element in tree.css(SELECTORS["tile"])]
+        
+        next_button = None
+        for button in tree.css(SELECTORS["button"]):
+            if "Next" in button.text(deep=False):
+                next_button = "disabled" not in button.attributes
+                break
+        
+        page_numbers = []
+        current_page = None
+        for element in tree.css(SELECTORS["page_link"]):
+            text = element.text(deep=False)
+            if PAGE_NUMBER_RE.match(text):
+                number = int(text)
+                page_numbers.append(number)
+                if is_current_page(element.attributes):
+                    current_page = number
+        
+        return ListingPage(tiles, next_button, page_numbers, current_page)
+    
+    def parse_detail(self, html_content):
+        tree = SelectolaxHTMLParser(html_content or "")
+        for key in ("detail_iframe", "detail_video"):
+            element = tree.css_first(SELECTORS[key])
+            if element and element.attributes.get("src"):
+                return element.attributes["src"]
+        return ""
+
+
+def get_parser(name="auto"):
+    """Create an HTML parser backend.
+    
+    name is one of "selectolax", "lxml", "html.parser" or "auto" (the fastest
+    backend that is installed).
+    """
+    if name == "auto":
+        if SelectolaxHTMLParser is not None:
+            return SelectolaxParser()
+        if lxml is not None:
+            return LxmlParser()
+        return SoupParser("html.parser")
+    
+    if name == "selectolax":
+        if SelectolaxHTMLParser is None:
+            raise ImportError("The selectolax parser backend requires 'pip install selectolax'")
+        return SelectolaxParser()
+    if name == "lxml":
+        if lxml is None:
+            raise ImportError("The lxml parser backend requires 'pip install lxml'")
+        return LxmlParser()
+    if name == "html.parser":
+        return SoupParser("html.parser")
+    raise ValueError(f"Unknown parser backend: {name}")
+
+
+def make_soup(html_content):
+    """Build a BeautifulSoup tree with the fastest installed tree builder"""
+    return BeautifulSoup(html_content or "", "lxml" if lxml is not None else "html.parser")
@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class CachedResponse:
+    """Minimal stand-in for a requests.Response served from the cache"""
+    def __init__(self, url, status_code, content, headers):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = True
+    
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+    
+    def json(self):
+        return json.loads(self.text)
+    
+    def raise_for_status(self):
+        # Only successful responses are ever stored
+        pass
+
+
+class HttpCache:
+    """Persistent HTTP response cache stored in a local SQLite database.
+
+    Entries are keyed by URL. Every URL belongs to a class ("listing", "detail"
+    or "api") with its own time-to-live; stale entries are revalidated with
+    If-None-Match / If-Modified-Since before being downloaded again. The store
+    is bounded by max_bytes and evicts the least recently used entries first.
+    """
+    # Time-to-live in seconds per URL class
+    DEFAULT_TTLS = {
+        "listing": 15 * 60,
+        "detail": 30 * 24 * 60 * 60,  # Clip detail pages basically never change
+        "api": 15 * 60
+    }
+    
+    def __init__(self, path="output/http_cache.sqlite", ttls=None, max_bytes=512 * 1024 * 1024):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        self.path = path
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self.max_bytes = max_bytes
+        
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        
+        # The connection is shared by the detail-fetch worker threads
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, status INTEGER, content BLOB, headers TEXT, "
+            "etag TEXT, last_modified TEXT, fetched_at REAL, accessed_at REAL, size INTEGER)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self.db.commit()
+    
+    def lookup(self, url):
+        """Return the cached row for url or None"""
+        with self.lock:
+            return self.db.execute(
+                "SELECT status, content, headers, etag, last_modified, fetched_at FROM responses WHERE url = ?",
+                (url,)
+            ).fetchone()
+    
+    def store(self, url, response):
+        """Store a successful response and evict old entries if the cache is full"""
+        content = response.content
+        # Read the validators before the case-insensitive headers become a plain dict
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        headers = dict(response.headers)
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, response.status_code, content, json.dumps(headers),
+                 etag, last_modified, now, now, len(content))
+            )
+            self.evict()
+            self.db.commit()
+    
+    def discard(self, url):
+        """Drop the entry of url, e.g. a response that turned out to be unusable"""
+        with self.lock:
+            self.db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self.db.commit()
+    
+    def touch(self, url, revalidated=False):
+        """Mark an entry as recently used (and fresh again after a 304)"""
+        now = time.time()
+        with self.lock:
+            if revalidated:
+                self.db.execute("UPDATE responses SET accessed_at = ?, fetched_at = ? WHERE url = ?", (now, now, url))
+            else:
+                self.db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (now, url))
+            self.db.commit()
+    
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes (lock held)"""
+        total_size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+        
+        for url, size in self.db.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall():
+            self.db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self.evictions += 1
+            total_size -= size
+            if total_size <= self.max_bytes:
+                break
+    
+    def prepare(self, url, headers=None, url_class="detail"):
+        """Look url up before a request, returns (fresh, cached, headers)
+        
+        fresh is True if the cached response can be served without a request.
+        Otherwise headers are the request headers, made conditional if there is
+        a stale entry to revalidate.
+        """
+        row = self.lookup(url)
+        if not row:
+            return False, None, headers
+        
+        status, content, cached_headers, etag, last_modified, fetched_at = row
+        cached = CachedResponse(url, status, content, json.loads(cached_headers))
+        
+        # Fresh entries are served without touching the network
+        if time.time() - fetched_at < self.ttls.get(url_class, 0):
+            self.touch(url)
+            with self.lock:
+                self.hits += 1
+            return True, cached, headers
+        
+        # Stale entries are revalidated with a conditional request
+        headers = dict(headers or {})
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return False, cached, headers
+    
+    def complete(self, url, response, cached):
+        """Store the response of a request made after prepare(), returns the response to use"""
+        if cached is not None and response.status_code == 304:
+            self.touch(url, revalidated=True)
+            with self.lock:
+                self.revalidations += 1
+            return cached
+        
+        with self.lock:
+            self.misses += 1
+        if response.status_code == 200:
+            self.store(url, response)
+        return response
+    
+    def get(self, session, url, headers=None, url_class="detail"):
+        """GET url through the cache using session (a requests-compatible client)"""
+        fresh, cached, headers = self.prepare(url, headers, url_class)
+        if fresh:
+            return cached
+        return self.complete(url, session.get(url, headers=headers), cached)
+    
+    async def get_async(self, session, url, headers=None, url_class="detail"):
+        """Like get() with an async session (see async_http)"""
+        fresh, cached, headers = self.prepare(url, headers, url_class)
+        if fresh:
+            return cached
+        return self.complete(url, await session.get(url, headers=headers), cached)
+    
+    def stats(self):
+        """Return the cache counters"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions
+        }
+    
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,129 @@
+import itertools
+import json
+import os
+from clip import as_dict, clip_key
+from output_file import atomic_output, write_version
+
+def iter_json_lines(path):
+    """Yield the clips of a JSON Lines file one at a time"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_clips_json(filename, clips, version=None, compact=False):
+    """Write clips from any iterable as a JSON document without holding them all in memory.
+
+    The output is identical to json.dump(..., indent=4), or to a minified dump
+    with compact: a {"version", "data"} document if version is given, a plain
+    list of clips otherwise. Clips may be clip.Clip records or dicts.
+    
+    The file is replaced atomically and compressed if its name ends in .gz or
+    .zst (see output_file). A versioned document also gets a version sidecar,
+    so the next run doesn't have to parse it. Returns the number of clips written.
+    """
+    count = 0
+    with atomic_output(filename) as f:
+        if compact:
+            if version is not None:
+                f.write('{"version":%d,"data":' % version)
+            f.write("[")
+            for clip in clips:
+                if count:
+                    f.write(",")
+                f.write(json.dumps(as_dict(clip), ensure_ascii=False, separators=(",", ":")))
+                count += 1
+            f.write("]")
+            if version is not None:
+                f.write("}")
+        
+        else:
+            # Nested clips are indented one level deeper inside the versioned document
+            prefix = "        " if version is not None else "    "
+            if version is not None:
+                f.write('{\n    "version": %d,\n    "data": ' % version)
+            
+            for clip in clips:
+                f.write("[\n" if count == 0 else ",\n")
+                clip_json = json.dumps(as_dict(clip), indent=4, ensure_ascii=False)
+                f.write("\n".join(prefix + line for line in clip_json.split("\n")))
+                count += 1
+            
+            if count == 0:
+                f.write("[]")
+            else:
+                f.write("\n" + prefix[4:] + "]")
+            
+            if version is not None:
+                f.write("\n}")
+    
+    if version is not None:
+        write_version(filename, version, count)
+    return count
+
+
+class JsonLinesSink:
+    """Append-only JSON Lines stream of scraped clips.
+
+    Every clip is written as one line as soon as it is parsed; flush() is
+    called once per page so a crash loses at most the page in progress.
+    finalize() turns the stream into the regular output document.
+    """
+    def __init__(self, path, append=False):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        self.path = path
+        self.file = open(path, "a" if append else "w", encoding="utf-8")
+        self.count = 0
+    
+    def write(self, clip):
+        self.file.write(json.dumps(as_dict(clip), ensure_ascii=False) + "\n")
+        self.count += 1
+    
+    def write_many(self, clips):
+        for clip in clips:
+            self.write(clip)
+    
+    def flush(self):
+        """Make everything written so far durable"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+    
+    def size(self):
+        """Size of the stream in bytes, including everything written so far"""
+        self.file.flush()
+        return os.fstat(self.file.fileno()).st_size
+    
+    def truncate(self, size, count):
+        """Cut the stream back to size bytes holding count clips (used when resuming)"""
+        self.file.flush()
+        self.file.truncate(size)
+        self.file.seek(0, os.SEEK_END)
+        self.count = count
+    
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+    
+    def finalize(self, filename, version=None, previous_clips=None, compact=False):
+        """Close the stream and write the output document from it.
+
+        previous_clips (incremental mode) are appended after the streamed
+        clips, except those replaced by a streamed clip with the same key
+        (see clip.clip_key). Returns the number of clips written.
+        """
+        self.close()
+        clips = iter_json_lines(self.path)
+        
+        if previous_clips is not None:
+            new_keys = {clip_key(clip) for clip in iter_json_lines(self.path)}
+            new_keys.discard(None)
+            clips = itertools.chain(
+                clips,
+                (clip for clip in previous_clips if clip_key(clip) not in new_keys)
+            )
+        
+        return write_clips_json(filename, clips, version, compact)
@@ -0,0 +1,127 @@
+import gzip
+import io
+import json
+import os
+from contextlib import contextmanager
+
+# Optional zstd compression
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compression by file suffix
+COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".zst": "zstd"
+}
+
+
+def compression_for(path):
+    """Compression of an output file from its suffix, None for plain JSON"""
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1])
+
+
+def with_compression(path, compression):
+    """Output path with the suffix of a compression ("gzip", "zstd" or None)"""
+    for suffix, name in COMPRESSION_SUFFIXES.items():
+        if name == compression and not path.endswith(suffix):
+            return path + suffix
+    return path
+
+
+def version_path(path):
+    """Sidecar holding the version of an output file"""
+    return path + ".version.json"
+
+
+def _check_zstd():
+    if zstandard is None:
+        raise ImportError("zstd output requires 'pip install zstandard'")
+
+
+@contextmanager
+def open_output(path):
+    """Open an output file for reading text, decompressing by suffix"""
+    compression = compression_for(path)
+    if compression == "gzip":
+        f = gzip.open(path, "rt", encoding="utf-8")
+    elif compression == "zstd":
+        _check_zstd()
+        f = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+    else:
+        f = open(path, "r", encoding="utf-8")
+    
+    with f:
+        yield f
+
+
+@contextmanager
+def atomic_output(path):
+    """Write an output file atomically, compressed by suffix.
+    
+    Everything goes to a temp file next to the destination, which is fsynced
+    and renamed over it only if the block finishes, so readers see either the
+    old or the new file and a crash never leaves a truncated output behind.
+    """
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    temp_path = path + ".tmp"
+    raw = open(temp_path, "wb")
+    try:
+        compression = compression_for(path)
+        if compression == "gzip":
+            f = io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode="wb"), encoding="utf-8")
+        elif compression == "zstd":
+            _check_zstd()
+            f = io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw, closefd=False), encoding="utf-8")
+        else:
+            f = io.TextIOWrapper(raw, encoding="utf-8")
+        
+        yield f
+        
+        # Closing the wrappers flushes the compressor, keep the raw file open for the fsync
+        f.flush()
+        if compression:
+            f.detach().close()
+        else:
+            f.detach()
+        raw.flush()
+        os.fsync(raw.fileno())
+        raw.close()
+        os.replace(temp_path, path)
+    except BaseException:
+        raw.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_version(path, version, count):
+    """Store the version and clip count of an output file in its sidecar"""
+    with atomic_output(version_path(path)) as f:
+        json.dump({"version": version, "count": count}, f)
+
+
+def read_version(path):
+    """Version of an output file, 0 if there is none.
+    
+    Read from the sidecar; only outputs written before sidecars existed are
+    parsed in full.
+    """
+    try:
+        with open(version_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)["version"]
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    if not os.path.exists(path):
+        return 0
+    try:
+        with open_output(path) as f:
+            existing_data = json.load(f)
+    except Exception as e:
+        print(f"Error reading existing file: {e}")
+        return 0
+    return existing_data.get("version", 0) if isinstance(existing_data, dict) else 0
@@ -0,0 +1,215 @@
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds, None if invalid"""
+    if not value:
+        return None
+    
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttled(status_code, headers=None, text=""):
+    """Check whether a response means we are being rate limited or challenged by Cloudflare"""
+    if status_code in (429, 503):
+        return True
+    
+    if status_code == 403:
+        headers = headers or {}
+        if headers.get("cf-mitigated") == "challenge":
+            return True
+        # Cloudflare's interstitial challenge page
+        return "Just a moment..." in (text or "") or "cf-chl" in (text or "")
+    
+    return False
+
+
+class HostRateLimiter:
+    """Cap the number of requests per second sent to each host.
+
+    Safe to share between worker threads: every caller reserves the next free
+    slot for its host under a lock and then sleeps outside of it.
+    """
+    def __init__(self, requests_per_second=None):
+        # None or 0 disables the cap
+        self.min_interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = {}
+    
+    def reserve(self, url):
+        """Reserve the next request to the host of url, returns the seconds to wait before sending it"""
+        if not self.min_interval:
+            return 0.0
+        
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        
+        return max(slot - now, 0.0)
+    
+    def share(self, parts):
+        """Scale the limiter down to one of parts processes that together keep to its rate"""
+        self.min_interval *= parts
+    
+    def wait(self, url):
+        """Block until a request to the host of url is allowed"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+    
+    def record(self, url, status_code=None, headers=None, text=""):
+        """Report the outcome of a request (a fixed rate ignores it)"""
+        pass
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """Per-host token bucket whose rate adapts to the server's responses (AIMD).
+
+    Healthy responses raise the rate additively up to max_rate; 429/503
+    responses and Cloudflare challenges cut it multiplicatively down to
+    min_rate, and a Retry-After header pauses the host for that long.
+    Failed requests (status_code None) count as a soft throttle.
+    """
+    def __init__(self, initial_rate=1.0, min_rate=0.2, max_rate=10.0, increase=0.25, decrease=0.5, burst=1):
+        super().__init__()
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self.hosts = {}
+        self.throttled_responses = 0
+    
+    def host_state(self, url):
+        """Bucket state of the host of url (lock held)"""
+        host = urlparse(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = {
+                "rate": self.initial_rate,
+                "tokens": float(self.burst),
+                "updated": time.monotonic(),
+                "blocked_until": 0.0
+            }
+        return self.hosts[host]
+    
+    def reserve(self, url):
+        """Take a token for the host of url, returns the seconds until it is available"""
+        with self._lock:
+            state = self.host_state(url)
+            now = time.monotonic()
+            
+            # Refill the bucket, then reserve a token (going into debt if it's empty)
+            state["tokens"] = min(self.burst, state["tokens"] + (now - state["updated"]) * state["rate"])
+            state["updated"] = now
+            state["tokens"] -= 1
+            
+            return max(-state["tokens"] / state["rate"], state["blocked_until"] - now, 0.0)
+    
+    def share(self, parts):
+        """Scale the rates down to one of parts processes that together keep to them"""
+        with self._lock:
+            self.initial_rate /= parts
+            self.min_rate /= parts
+            self.max_rate /= parts
+            self.increase /= parts
+            for state in self.hosts.values():
+                state["rate"] /= parts
+    
+    def record(self, url, status_code=None, headers=None, text=""):
+        """Adapt the host's rate to the outcome of a request"""
+        with self._lock:
+            state = self.host_state(url)
+            
+            if status_code is not None and not is_throttled(status_code, headers, text):
+                state["rate"] = min(self.max_rate, state["rate"] + self.increase)
+                return
+            
+            # Back off: multiplicative decrease, and honor Retry-After if the server sent one
+            state["rate"] = max(self.min_rate, state["rate"] * self.decrease)
+            if status_code is not None:
+                self.throttled_responses += 1
+                retry_after = parse_retry_after((headers or {}).get("Retry-After"))
+                if retry_after:
+                    state["blocked_until"] = max(state["blocked_until"], time.monotonic() + retry_after)
+    
+    def rates(self):
+        """Current requests per second for every host"""
+        with self._lock:
+            return {host: round(state["rate"], 2) for host, state in self.hosts.items()}
+
+
+class RateLimitedSession:
+    """Wrap a requests-compatible session so every GET goes through a rate limiter
+    
+    With a run_metrics.RunMetrics the latency, status and size of every
+    response are recorded under kind (e.g. "listing" or "detail").
+    """
+    def __init__(self, session, rate_limiter, metrics=None, kind="request"):
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.kind = kind
+    
+    def get(self, url, **kwargs):
+        self.rate_limiter.wait(url)
+        start_time = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+        except Exception as e:
+            self.rate_limiter.record(url)
+            if self.metrics:
+                self.metrics.count("scraper_request_errors_total", kind=self.kind, error=e.__class__.__name__)
+            raise
+        
+        if self.metrics:
+            self.metrics.record_response(self.kind, time.perf_counter() - start_time, response)
+        
+        # Only challenge pages need their body inspected
+        text = response.text if response.status_code == 403 else ""
+        self.rate_limiter.record(url, response.status_code, response.headers, text)
+        return response
+
+
+class AsyncRateLimitedSession:
+    """RateLimitedSession for an async client (see async_http): waits without blocking the event loop"""
+    def __init__(self, session, rate_limiter, metrics=None, kind="request"):
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.kind = kind
+    
+    async def get(self, url, **kwargs):
+        delay = self.rate_limiter.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        start_time = time.perf_counter()
+        try:
+            response = await self.session.get(url, **kwargs)
+        except Exception as e:
+            self.rate_limiter.record(url)
+            if self.metrics:
+                self.metrics.count("scraper_request_errors_total", kind=self.kind, error=e.__class__.__name__)
+            raise
+        
+        if self.metrics:
+            self.metrics.record_response(self.kind, time.perf_counter() - start_time, response)
+        
+        # Only challenge pages need their body inspected
+        text = response.text if response.status_code == 403 else ""
+        self.rate_limiter.record(url, response.status_code, response.headers, text)
+        return response
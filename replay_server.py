@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import synthetic
+
+# Paths of the tracker.gg pages the scrapers request
+LISTING_PATH = "/valorant/guides/clips"
+API_PATH = "/api/v2/valorant/guides/clips"
+DETAIL_PATH_RE = re.compile(r"^/valorant/guides/clips/([^/]+)/?$")
+
+# Debug dumps of the scrapers -> fixture names (see record_fixtures)
+DUMP_FIXTURES = [
+    (re.compile(r"^api_page_(\d+)\.json$"), "api_page_{}.json"),
+    (re.compile(r"^page_(\d+)_selenium\.html$"), "listing_page_{}.html"),
+    (re.compile(r"^tracker_page\.html$"), "listing_page_1.html")
+]
+
+
+def record_fixtures(fixtures_dir, output_dir="output"):
+    """Copy the debug dumps of earlier crawls into a fixtures directory, returns the fixture names
+    
+    API pages (api_page_N.json) are kept as they are, rendered Selenium pages
+    (page_N_selenium.html) and the page of fetch_html.py (tracker_page.html)
+    become listing pages. Existing fixtures are not overwritten.
+    """
+    os.makedirs(fixtures_dir, exist_ok=True)
+    recorded = []
+    for name in sorted(os.listdir(output_dir)):
+        for dump_re, fixture_name in DUMP_FIXTURES:
+            dump_match = dump_re.match(name)
+            if not dump_match:
+                continue
+            fixture_name = fixture_name.format(*dump_match.groups())
+            fixture_path = os.path.join(fixtures_dir, fixture_name)
+            if not os.path.exists(fixture_path):
+                shutil.copyfile(os.path.join(output_dir, name), fixture_path)
+                recorded.append(fixture_name)
+    return recorded
+
+
+class ReplayServer:
+    """Local stand-in for tracker.gg serving recorded or synthetic pages.
+    
+    Serves the listing pages, clip detail pages and API pages the scrapers
+    request. A page is read from fixtures_dir (listing_page_N.html,
+    detail_<id>.html, api_page_N.json) if it was recorded there, otherwise it
+    is generated (see synthetic) for a listing of pages pages with
+    clips_per_page clips each. Every response is delayed by latency plus up to
+    jitter seconds, and error_rate of them fail with error_status, so
+    throughput and failure handling can be measured without the network.
+    scraper_kwargs() gives the arguments that point a scraper at the server.
+    """
+    def __init__(self, pages=10, clips_per_page=24, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503,
+                 fixtures_dir=None, seed=0, host="127.0.0.1", port=0):
+        self.pages = pages
+        self.clips_per_page = clips_per_page
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fixtures_dir = fixtures_dir
+        
+        # Seeded so a benchmark fails the same requests every run
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        
+        # Requests and injected errors per kind of page
+        self.requests = Counter()
+        self.errors = Counter()
+        
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+    
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def listing_url(self):
+        return self.url + LISTING_PATH
+    
+    @property
+    def api_url(self):
+        return self.url + API_PATH
+    
+    def scraper_kwargs(self, method):
+        """Keyword arguments pointing the scraper of method ("api", "tracker" or "selenium") at the server"""
+        if method == "api":
+            return {"base_url": self.api_url, "site_url": self.url}
+        return {"base_url": self.listing_url}
+    
+    def start(self):
+        """Serve in a background thread"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+    
+    def fixture(self, name):
+        """Contents of a recorded fixture, None if there is none"""
+        if not self.fixtures_dir:
+            return None
+        path = os.path.join(self.fixtures_dir, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    
+    def route(self, path, query):
+        """Kind, status, content type and body of the response to a request"""
+        page_num = int(query.get("page", ["1"])[0])
+        if path.rstrip("/") == LISTING_PATH:
+            body = self.fixture(f"listing_page_{page_num}.html")
+            if body is None:
+                body = synthetic.listing_html(page_num, self.clips_per_page, self.pages)
+            return "listing", 200, "text/html; charset=utf-8", body
+        
+        if path.rstrip("/") == API_PATH:
+            body = self.fixture(f"api_page_{page_num}.json")
+            if body is None:
+                body = json.dumps(synthetic.api_page(page_num, self.clips_per_page, self.pages))
+            return "api", 200, "application/json", body
+        
+        detail_match = DETAIL_PATH_RE.match(path)
+        if detail_match:
+            clip_id = detail_match.group(1)
+            body = self.fixture(f"detail_{clip_id}.html")
+            if body is None and clip_id.isdigit():
+                body = synthetic.detail_html(int(clip_id))
+            if body is not None:
+                return "detail", 200, "text/html; charset=utf-8", body
+        
+        return "other", 404, "text/plain", "Not found"
+    
+    def respond(self, handler):
+        """Answer a request after the configured latency, failing error_rate of them"""
+        parts = urlsplit(handler.path)
+        kind, status, content_type, body = self.route(parts.path, parse_qs(parts.query))
+        
+        with self.lock:
+            self.requests[kind] += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            failed = status == 200 and self.random.random() < self.error_rate
+            if failed:
+                self.errors[kind] += 1
+        
+        if delay:
+            time.sleep(delay)
+        if failed:
+            status, content_type, body = self.error_status, "text/plain", "Injected error"
+        
+        content = body.encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
+    
+    def handler_class(self):
+        server = self
+        
+        class ReplayHandler(BaseHTTPRequestHandler):
+            # Keep-alive, like the real site
+            protocol_version = "HTTP/1.1"
+            
+            def do_GET(self):
+                server.respond(self)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return ReplayHandler
+    
+    def stats(self):
+        """Requests and injected errors per kind of page"""
+        return {"requests": dict(self.requests), "errors": dict(self.errors)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded or synthetic tracker.gg pages locally")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--pages", type=int, default=10, help="number of listing and API pages")
+    parser.add_argument("--clips-per-page", type=int, default=24)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every response is delayed")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many seconds of extra random delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of the responses that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="status code of the failed responses")
+    parser.add_argument("--fixtures", default=None, help="directory of recorded pages, served instead of synthetic ones")
+    parser.add_argument("--record", action="store_true",
+                        help="copy the debug dumps in output/ into the fixtures directory first")
+    args = parser.parse_args()
+    
+    if args.record:
+        if not args.fixtures:
+            parser.error("--record needs --fixtures")
+        print(f"Recorded fixtures: {record_fixtures(args.fixtures)}")
+    
+    server = ReplayServer(pages=args.pages, clips_per_page=args.clips_per_page, latency=args.latency,
+                          jitter=args.jitter, error_rate=args.error_rate, error_status=args.error_status,
+                          fixtures_dir=args.fixtures, port=args.port)
+    print(f"Serving on {server.url}")
+    for method in ("api", "tracker", "selenium"):
+        print(f"  {method}: {server.scraper_kwargs(method)}")
+    
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"Served: {server.stats()}")
@@ -0,0 +1,195 @@
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+
+# Status codes worth retrying; anything else (404, 410, ...) is a permanent failure
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """A request that failed for good, as opposed to a page that has no more clips"""
+    def __init__(self, url, message, transient=True):
+        super().__init__(f"{url}: {message}")
+        self.url = url
+        # True if retrying later might succeed (network errors, 5xx, rate limiting)
+        self.transient = transient
+
+
+class CircuitOpenError(FetchError):
+    """The circuit breaker of the host is open, the request was not attempted"""
+    pass
+
+
+class InvalidResponseError(Exception):
+    """A successful response whose body can't be read (e.g. a Cloudflare challenge instead of JSON)"""
+    pass
+
+
+def is_retryable(error):
+    """Classify an exception raised while fetching as transient (True) or permanent (False)"""
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = error.response
+        return response is None or response.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, InvalidResponseError):
+        return True
+    if isinstance(error, (requests.exceptions.ConnectionError,
+                          requests.exceptions.Timeout,
+                          requests.exceptions.ChunkedEncodingError)):
+        return True
+    # cloudscraper raises its own exceptions when a challenge can't be solved, try again later
+    return "Cloudflare" in type(error).__name__
+
+
+def circuit_name(key):
+    """Readable name of a circuit, e.g. tracker.gg (detail)"""
+    host, url_class = key
+    return f"{host} ({url_class})" if url_class else host
+
+
+class CircuitBreaker:
+    """Circuit breaker per host and kind of request.
+
+    After failure_threshold consecutive transient failures the circuit opens
+    and requests fail fast for reset_timeout seconds; then a single trial
+    request is let through (half-open) and closes the circuit if it succeeds.
+    The kinds of request (url_class, e.g. "listing" and "detail") of a host
+    have separate circuits, so failing detail pages don't stop the listing.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = {}
+        self.opened_at = {}
+    
+    def circuit(self, url, url_class=None):
+        return urlparse(url).netloc, url_class
+    
+    def before_request(self, url, url_class=None, wait=False):
+        """Check whether a request to url may be attempted now
+        
+        Raises CircuitOpenError while the circuit is open, or with wait=True
+        returns the seconds until the half-open trial instead (0 if the request
+        may go ahead).
+        """
+        key = self.circuit(url, url_class)
+        with self.lock:
+            opened_at = self.opened_at.get(key)
+            if opened_at is None:
+                return 0
+            remaining = opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                if wait:
+                    return remaining
+                raise CircuitOpenError(url, f"circuit open for {circuit_name(key)} after {self.failures[key]} failures")
+            # Half-open: let this request through as a trial, fail fast again if it fails
+            self.opened_at[key] = time.monotonic()
+            return 0
+    
+    def is_open(self, url, url_class=None):
+        """Check whether the circuit of url is currently open"""
+        key = self.circuit(url, url_class)
+        with self.lock:
+            opened_at = self.opened_at.get(key)
+            return opened_at is not None and time.monotonic() - opened_at < self.reset_timeout
+    
+    def record_success(self, url, url_class=None):
+        key = self.circuit(url, url_class)
+        with self.lock:
+            self.failures.pop(key, None)
+            self.opened_at.pop(key, None)
+    
+    def record_failure(self, url, url_class=None):
+        key = self.circuit(url, url_class)
+        with self.lock:
+            self.failures[key] = self.failures.get(key, 0) + 1
+            if self.failures[key] >= self.failure_threshold:
+                if key not in self.opened_at:
+                    print(f"Circuit breaker opened for {circuit_name(key)}")
+                self.opened_at[key] = time.monotonic()
+
+
+class RetryPolicy:
+    """Retry transient failures with jittered exponential backoff.
+
+    Attempt n (starting at 1) is followed by a random delay between 0 and
+    min(max_delay, base_delay * 2 ** n) seconds ("full jitter").
+    """
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, circuit_breaker=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.lock = threading.Lock()
+        self.retries = 0
+        self.failures = 0
+    
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+    
+    def failure_delay(self, url, attempt, error, url_class=None, wait=False):
+        """Count a failed attempt, returns the backoff before the next one or raises FetchError when giving up"""
+        if isinstance(error, CircuitOpenError):
+            with self.lock:
+                self.failures += 1
+            raise error
+        
+        transient = is_retryable(error)
+        if transient:
+            self.circuit_breaker.record_failure(url, url_class)
+        
+        # No point in waiting for another attempt once the circuit is open, unless we wait for the trial
+        if (not transient or attempt == self.max_attempts
+                or (not wait and self.circuit_breaker.is_open(url, url_class))):
+            with self.lock:
+                self.failures += 1
+            raise FetchError(url, f"{error} (after {attempt} attempts)", transient) from error
+        
+        delay = self.backoff(attempt)
+        print(f"Attempt {attempt} for {url} failed ({error}), retrying in {delay:.1f}s")
+        with self.lock:
+            self.retries += 1
+        return delay
+    
+    def call(self, url, func, url_class=None, wait=False):
+        """Call func() (a request to url) until it succeeds, raising FetchError when giving up
+        
+        url_class picks the circuit of the request (see CircuitBreaker). With
+        wait=True an open circuit is waited out until its half-open trial
+        instead of failing fast, for requests the crawl can't go on without.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                delay = self.circuit_breaker.before_request(url, url_class, wait)
+                while delay:
+                    print(f"Circuit open for {url}, waiting {delay:.1f}s for the trial request")
+                    time.sleep(delay)
+                    delay = self.circuit_breaker.before_request(url, url_class, wait)
+                result = func()
+            except Exception as e:
+                time.sleep(self.failure_delay(url, attempt, e, url_class, wait))
+            else:
+                self.circuit_breaker.record_success(url, url_class)
+                return result
+    
+    async def call_async(self, url, func, url_class=None, wait=False):
+        """Like call() for a coroutine function, backing off without blocking the event loop"""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                delay = self.circuit_breaker.before_request(url, url_class, wait)
+                while delay:
+                    print(f"Circuit open for {url}, waiting {delay:.1f}s for the trial request")
+                    await asyncio.sleep(delay)
+                    delay = self.circuit_breaker.before_request(url, url_class, wait)
+                result = await func()
+            except Exception as e:
+                await asyncio.sleep(self.failure_delay(url, attempt, e, url_class, wait))
+            else:
+                self.circuit_breaker.record_success(url, url_class)
+                return result
+    
+    def stats(self):
+        return {"retries": self.retries, "failures": self.failures}
@@ -0,0 +1,193 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from output_file import atomic_output
+
+# Upper bounds in seconds of the latency histogram buckets (those of the Prometheus clients, plus 30s for Cloudflare)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def series_name(name, labels):
+    """Prometheus series name, e.g. scraper_request_seconds{kind="listing"}"""
+    if not labels:
+        return name
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+    return f"{name}{{{label_text}}}"
+
+
+class Histogram:
+    """Counts of observed values per bucket, plus their sum and maximum"""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket and one for the values above the last bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+    
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the maximum for the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+    
+    def cumulative_counts(self):
+        """(upper bound, values <= bound) per bucket, ending with ("+Inf", count)"""
+        counts = []
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            counts.append((bound, seen))
+        counts.append(("+Inf", self.count))
+        return counts
+    
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 6),
+            "buckets": {str(bound): count for bound, count in self.cumulative_counts()}
+        }
+
+
+class RunMetrics:
+    """Counters and latency histograms of a crawl, shared by the worker threads.
+    
+    Series are identified by a name and labels (e.g. kind="detail"), like
+    Prometheus metrics. report() gives the JSON run report, prometheus_text()
+    the Prometheus text exposition format, e.g. for the node exporter's
+    textfile collector.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started_at = time.time()
+    
+    def count(self, name, value=1, **labels):
+        """Add value to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def set(self, name, value, **labels):
+        """Set a counter kept elsewhere (e.g. the retries of the retry policy)"""
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] = value
+    
+    def observe(self, name, value, **labels):
+        """Add a value (seconds) to a histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+    
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of a block in a histogram"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_time, **labels)
+    
+    def record_response(self, kind, seconds, response):
+        """Record a response that came over the network: latency, status and size"""
+        self.observe("scraper_request_seconds", seconds, kind=kind)
+        self.count("scraper_responses_total", kind=kind, status=response.status_code)
+        self.count("scraper_response_bytes_total", len(response.content or b""), kind=kind)
+    
+    def report(self):
+        """The run report: counters and histogram summaries by series name"""
+        with self.lock:
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+                "duration_seconds": round(time.time() - self.started_at, 3),
+                "counters": {series_name(name, labels): value for (name, labels), value in sorted(self.counters.items())},
+                "histograms": {series_name(name, labels): histogram.to_dict()
+                               for (name, labels), histogram in sorted(self.histograms.items())}
+            }
+    
+    def prometheus_text(self):
+        """All series in the Prometheus text exposition format"""
+        lines = []
+        typed = set()
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{series_name(name, labels)} {value}")
+            
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                for bound, count in histogram.cumulative_counts():
+                    lines.append(f"{series_name(name + '_bucket', labels + (('le', bound),))} {count}")
+                lines.append(f"{series_name(name + '_sum', labels)} {histogram.sum}")
+                lines.append(f"{series_name(name + '_count', labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+    
+    def write_report(self, filename):
+        """Write the JSON run report"""
+        with atomic_output(filename) as f:
+            json.dump(self.report(), f, indent=4)
+        print(f"Saved the run report to {filename}")
+    
+    def write_prometheus(self, filename):
+        """Write the Prometheus text file (replaced atomically, as the textfile collector expects)"""
+        with atomic_output(filename) as f:
+            f.write(self.prometheus_text())
+        print(f"Saved the Prometheus metrics to {filename}")
+
+
+def collect_scraper_stats(scraper):
+    """Copy the counters a scraper already keeps (retries, throttling, cache, skipped clips) into its metrics"""
+    metrics = scraper.metrics
+    retry_policy = getattr(scraper, "retry_policy", None)
+    if retry_policy is not None:
+        metrics.set("scraper_retries_total", retry_policy.retries)
+        metrics.set("scraper_fetch_failures_total", retry_policy.failures)
+    
+    # 429/503 responses and Cloudflare challenges the adaptive rate limiter backed off for
+    throttled_responses = getattr(getattr(scraper, "rate_limiter", None), "throttled_responses", None)
+    if throttled_responses is not None:
+        metrics.set("scraper_throttled_responses_total", throttled_responses)
+    
+    cache = getattr(scraper, "cache", None)
+    if cache:
+        for name, value in cache.stats().items():
+            metrics.set(f"scraper_cache_{name}_total", value)
+    
+    metrics.set("scraper_skipped_clips_total", getattr(scraper, "known_entries", 0), reason="known")
+    metrics.set("scraper_skipped_clips_total", scraper.seen.duplicates, reason="duplicate")
+
+
+def write_run_metrics(scraper, report_file=None, prometheus_file=None):
+    """Write the JSON run report and/or the Prometheus text file of a scraper's crawl"""
+    collect_scraper_stats(scraper)
+    if report_file:
+        scraper.metrics.write_report(report_file)
+    if prometheus_file:
+        scraper.metrics.write_prometheus(prometheus_file)
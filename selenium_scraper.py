@@ -1,137 +1,114 @@
-import time
-import json
-import random
 import os
 import re
+import argparse
 from urllib.parse import urljoin
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from bs4 import BeautifulSoup
+from jsonl_sink import JsonLinesSink, iter_json_lines, write_clips_json
+from clip_store import SeenClips
+from checkpoint import Checkpoint
+from rate_limiter import AdaptiveRateLimiter
+from driver_pool import DriverPool, page_metrics
+from html_parsers import get_parser, thumbnail_video_url
+from tag_classifier import classify_tags
+from clip import Clip
+from output_file import with_compression
+from run_metrics import RunMetrics, write_run_metrics
+
+# Listing pages of the clips, clip detail links are resolved against its origin
+BASE_URL = "https://tracker.gg/valorant/guides/clips"
 
 class SeleniumTrackerScraper:
-    def __init__(self, headless=True):
-        self.base_url = "https://tracker.gg/valorant/guides/clips"
+    def __init__(self, headless=True, sink=None, checkpoint=None, rate_limiter=None, pool_size=1,
+                 recycle_after=50, pool=None, parser="auto", extract="page_source", block_resources=True,
+                 allow=(), base_url=BASE_URL, metrics=None):
+        # Point base_url at a replay_server.ReplayServer to scrape without the network
+        self.base_url = base_url
         
-        # Setup Chrome options
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--start-maximized")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
+        # "page_source" parses the rendered HTML of a page once with the HTML parser backend,
+        # "elements" queries every tile field over WebDriver (one round trip each, much slower)
+        if extract not in ("page_source", "elements"):
+            raise ValueError(f"Unknown extract mode: {extract}")
+        self.extract = extract
+        self.parser = get_parser(parser)
         
-        # Initialize the Chrome driver
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=chrome_options
-        )
+        # Pool of warm Chrome drivers (see driver_pool), pool_size pages are loaded concurrently.
+        # Images, fonts and media are blocked unless block_resources is off or they are in allow
+        self.pool = pool or DriverPool(pool_size, headless=headless, recycle_after=recycle_after,
+                                       block_resources=block_resources, allow=allow)
         
-        # Set user agent
-        self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-            "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.results = []
         
-        # Agent ID mapping
-        self.agent_ids = {
-            "Astra": "41fb69c1-4189-7b37-f117-bcaf1e96f1bf",
-            "Breach": "5f8d3a7f-467b-97f3-062c-13acf203c006",
-            "Brimstone": "9f0d8ba9-4140-b941-57d3-a7ad57c6b417",
-            "Chamber": "22697a3d-45bf-8dd7-4fec-84a9e28c69d7",
-            "Clove": "1dbf2edd-4729-0984-3115-daa5eed44993",
-            "Cypher": "117ed9e3-49f3-6512-3ccf-0cada7e3823b",
-            "Deadlock": "cc8b64c8-4b25-4ff9-6e7f-37b4da43d235",
-            "Fade": "dade69b4-4f5a-8528-247b-219e5a1facd6",
-            "Gekko": "e370fa57-4757-3604-3648-499e1f642d3f",
-            "Harbor": "95b78ed7-4637-86d9-7e41-71ba8c293152",
-            "Iso": "0e38b510-41a8-5780-5e8f-568b2a4f2d6c",
-            "Jett": "add6443a-41bd-e414-f6ad-e58d267f4e95",
-            "KAY/O": "601dbbe7-43ce-be57-2a40-4abd24953621",
-            "Killjoy": "1e58de9c-4950-5125-93e9-a0aee9f98746",
-            "Neon": "bb2a4828-46eb-8cd1-e765-15848195d751",
-            "Omen": "8e253930-4c05-31dd-1b6c-968525494517",
-            "Phoenix": "eb93336a-449b-9c1b-0a54-a891f7921d69",
-            "Raze": "f94c3b30-42be-e959-889c-5aa313dba261",
-            "Reyna": "a3bfb853-43b2-7238-a4f1-ad90e9e46bcc",
-            "Sage": "569fdd95-4d10-43ab-ca70-79becc718b46",
-            "Skye": "6f2a04ca-43e0-be17-7f36-b3908627744d",
-            "Sova": "320b2a48-4d9b-a075-30f1-1f93a9b638fa",
-            "Tejo": "b444168c-4e35-8076-db47-ef9bf368f384",
-            "Viper": "707eab51-4836-f488-046a-cda6bf494859",
-            "Vyse": "efba5359-4016-a1e5-7626-b1ae76895940",
-            "Yoru": "7f94d92c-4234-0a36-9646-3a87eb8b5c89"
-        }
+        # Keys of the clips collected so far, the listing shifts during long crawls and repeats clips
+        self.seen = SeenClips()
         
-        # Map ID mapping
-        self.map_ids = {
-            "Abyss": "Infinity",
-            "Ascent": "Ascent",
-            "Bind": "Duality",
-            "Breeze": "Foxtrot",
-            "Fracture": "Canyon",
-            "Haven": "Triad",
-            "Icebox": "Port",
-            "Lotus": "Jam",
-            "Sunset": "Juliett",
-            "Split": "Bonsai",
-            "Pearl": "Pitt"
-        }
+        # Optional jsonl_sink.JsonLinesSink: clips are streamed to disk instead of kept in self.results
+        self.sink = sink
         
-        # Team ID mapping
-        self.team_ids = {
-            "Attack": "Red",
-            "Defense": "Blue"
-        }
+        # Adaptive rate limiter instead of fixed delays between page loads
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(initial_rate=0.5, max_rate=2.0)
         
-        self.results = []
-    
-    def get_agent_id(self, agent_name):
-        """Convert agent name to agent ID"""
-        return self.agent_ids.get(agent_name, "")
-    
-    def get_map_id(self, map_name):
-        """Convert map name to map ID"""
-        return self.map_ids.get(map_name, "")
-    
-    def get_team_id(self, team_name):
-        """Convert team name to team ID"""
-        return self.team_ids.get(team_name, "Neutral")
+        # Optional checkpoint.Checkpoint written after every page so a crawl can be resumed
+        self.checkpoint = checkpoint
+        self.start_page = 1
+        self.skipped_entries = 0
+        self.total_entries = 0
+        self.stats_lock = threading.Lock()
+        
+        # Page loads, parse times and skip reasons (see run_metrics)
+        self.metrics = metrics or RunMetrics()
+        
+        # Page load metrics, to compare runs with and without resource blocking
+        self.loaded_pages = 0
+        self.transferred_bytes = 0
+        self.page_requests = 0
+        self.page_load_ms = 0
     
-    def clean_tags(self, tags):
-        """Remove map, team, and agent from tags"""
-        clean_tags = []
-        for tag in tags:
-            # Skip if tag is a map, team, or agent
-            if tag in self.map_ids or tag in ["Attack", "Defense"] or tag in self.agent_ids:
-                continue
-            clean_tags.append(tag)
-        return clean_tags
+    def add_results(self, page_results):
+        """Keep the clips of a page in memory, or stream them to the sink and flush"""
+        page_results = self.seen.filter(page_results)
+        self.metrics.count("scraper_clips_total", len(page_results))
+        if self.sink:
+            self.sink.write_many(page_results)
+            self.sink.flush()
+        else:
+            self.results.extend(page_results)
     
-    def navigate_to_page(self, page_num):
-        """Navigate to a specific page of clips"""
+    def navigate_to_page(self, page_num, driver):
+        """Navigate to a specific page of clips
+
+        Returns False if the page didn't load; errors that mean the browser itself
+        is broken are raised so the pool can replace the driver.
+        """
         url = f"{self.base_url}?page={page_num}"
+        self.rate_limiter.wait(url)
         try:
-            self.driver.get(url)
+            driver.get(url)
             # Wait for the page to load
-            WebDriverWait(self.driver, 20).until(
+            WebDriverWait(driver, 20).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "div.guide-tile"))
             )
+            self.rate_limiter.record(url, 200)
             return True
         except TimeoutException:
             print(f"Timeout waiting for page {page_num} to load")
+            # A Cloudflare challenge page never shows the tiles, back off harder in that case
+            if "Just a moment" in driver.title:
+                self.rate_limiter.record(url, 403, {"cf-mitigated": "challenge"})
+            else:
+                self.rate_limiter.record(url)
             return False
+        except WebDriverException:
+            self.rate_limiter.record(url)
+            raise
         except Exception as e:
             print(f"Error navigating to page {page_num}: {e}")
+            self.rate_limiter.record(url)
             return False
     
     def parse_clip(self, clip_element):
@@ -160,30 +137,6 @@ class SeleniumTrackerScraper:
             except NoSuchElementException:
                 pass
             
-            # Extract map ID from tags
-            map_id = ""
-            for tag in tags:
-                if tag in self.map_ids:
-                    map_id = self.get_map_id(tag)
-                    break
-            
-            # Extract team ID from tags
-            team_id = "Neutral"
-            for tag in tags:
-                if tag in self.team_ids:
-                    team_id = self.get_team_id(tag)
-                    break
-            
-            # Extract agent ID from tags
-            agent_id = ""
-            for tag in tags:
-                if tag in self.agent_ids:
-                    agent_id = self.get_agent_id(tag)
-                    break
-            
-            # Clean tags (remove map, team, agent)
-            clean_tags = self.clean_tags(tags)
-            
             # Extract video URL
             video_url = ""
             try:
@@ -218,45 +171,55 @@ class SeleniumTrackerScraper:
             except NoSuchElementException:
                 pass
             
-            # Create clip data dictionary
-            clip_data = {
-                "title": title,
-                "description": description,
-                "tags": clean_tags
-            }
+            return self.build_clip(title, description, tags, video_url, thumbnail_url, author, source_url)
             
-            # Only add non-empty fields
-            if map_id:
-                clip_data["mapID"] = map_id
-            if team_id != "Neutral":
-                clip_data["teamID"] = team_id
-            if agent_id:
-                clip_data["agentID"] = agent_id
-            if video_url:
-                clip_data["videoURL"] = video_url
-            if thumbnail_url:
-                clip_data["thumbnailURL"] = thumbnail_url
-            if author:
-                clip_data["author"] = author
-            if source_url:
-                clip_data["sourceURL"] = source_url
-                
-            return clip_data
+        except Exception as e:
+            print(f"Error parsing clip: {e}")
+            return None
+    
+    def parse_html_clip(self, raw_tile):
+        """Parse a single tile of a ListingPage parsed from the rendered page source"""
+        try:
+            # The rendered tile embeds its player, fall back to the ID in the thumbnail
+            video_url = raw_tile["video_url"] or thumbnail_video_url(raw_tile["thumbnail_url"])
+            source_url = urljoin(self.base_url, raw_tile["href"]) if raw_tile["href"] else ""
             
+            return self.build_clip(raw_tile["title"], "", raw_tile["tags"], video_url,
+                                   raw_tile["thumbnail_url"], raw_tile["author"], source_url)
+        
         except Exception as e:
             print(f"Error parsing clip: {e}")
             return None
     
-    def parse_page(self):
-        """Parse the current page and extract clip data"""
+    def build_clip(self, title, description, tags, video_url, thumbnail_url, author, source_url):
+        """Build the Clip from the fields of a tile"""
+        # Split the tags into map, team, agent and the remaining tags
+        map_id, team_id, agent_id, clean_tags = classify_tags(tags)
+        
+        # Empty fields are left out of the output by Clip.to_dict()
+        return Clip(
+            title=title,
+            description=description,
+            tags=clean_tags,
+            map_id=map_id,
+            team_id=team_id,
+            agent_id=agent_id,
+            video_url=video_url,
+            thumbnail_url=thumbnail_url,
+            author=author,
+            source_url=source_url
+        )
+    
+    def parse_page(self, driver):
+        """Parse the current page of a driver and extract clip data"""
         try:
             # Wait for the clips to load
-            WebDriverWait(self.driver, 10).until(
+            WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "div.guide-tile"))
             )
             
             # Find all clip elements
-            clip_elements = self.driver.find_elements(By.CSS_SELECTOR, "div.guide-tile")
+            clip_elements = driver.find_elements(By.CSS_SELECTOR, "div.guide-tile")
             print(f"Found {len(clip_elements)} clip elements on the page")
             
             page_results = []
@@ -264,17 +227,39 @@ class SeleniumTrackerScraper:
                 clip_data = self.parse_clip(clip_element)
                 if clip_data:
                     page_results.append(clip_data)
-                    
-            return page_results
+            
+            return page_results, len(clip_elements)
         
         except Exception as e:
             print(f"Error parsing page: {e}")
-            return []
+            return [], 0
     
-    def check_next_page_exists(self):
+    def parse_page_source(self, html_content):
+        """Parse the rendered HTML of a page in one pass, returns (clips, has_next, tiles on the page)"""
+        with self.metrics.timer("scraper_parse_seconds", kind="rendered"):
+            listing = self.parser.parse_listing(html_content)
+        print(f"Found {len(listing.tiles)} clip elements on the page")
+        
+        page_results = []
+        for raw_tile in listing.tiles:
+            clip_data = self.parse_html_clip(raw_tile)
+            if clip_data:
+                page_results.append(clip_data)
+        
+        # No next button at all means there is no next page either
+        return page_results, bool(listing.has_next), len(listing.tiles)
+    
+    def count_entries(self, entries, page_results):
+        """Add a kept page to the entry counters, entries is the number of tiles on it"""
+        with self.stats_lock:
+            self.total_entries += entries
+            self.skipped_entries += entries - len(page_results)
+        self.metrics.count("scraper_skipped_clips_total", entries - len(page_results), reason="unparsed")
+    
+    def check_next_page_exists(self, driver):
         """Check if there's a next page"""
         try:
-            next_buttons = self.driver.find_elements(By.XPATH, "//button[contains(text(), 'Next')]")
+            next_buttons = driver.find_elements(By.XPATH, "//button[contains(text(), 'Next')]")
             for button in next_buttons:
                 if not button.get_attribute("disabled"):
                     return True
@@ -283,66 +268,224 @@ class SeleniumTrackerScraper:
             print(f"Error checking for next page: {e}")
             return False
     
-    def scrape(self, start_page=1, max_pages=None):
-        """Scrape clips from tracker.gg, starting from start_page"""
+    def scrape_page(self, page_num, attempts=2):
+        """Load and parse a page on a pooled driver, returns (clips, has_next) or None if it failed"""
+        page = self.load_page(page_num, attempts)
+        if page is None:
+            return None
+        
+        page_results, has_next, entries = page
+        self.count_entries(entries, page_results)
+        return page_results, has_next
+    
+    def load_page(self, page_num, attempts=2):
+        """Load and parse a page without counting it, returns (clips, has_next, entries) or None if it failed
+        
+        A page whose browser crashed is retried on a fresh driver.
+        """
+        for attempt in range(attempts):
+            try:
+                with self.pool.driver() as driver:
+                    if not self.navigate_to_page(page_num, driver):
+                        return None
+                    
+                    self.record_page_metrics(driver)
+                    
+                    # Fetch the rendered page once, save it for debugging
+                    html_content = driver.page_source
+                    with open(f"output/page_{page_num}_selenium.html", "w", encoding="utf-8") as f:
+                        f.write(html_content)
+                    
+                    # Parse the page and extract clip data
+                    if self.extract == "page_source":
+                        return self.parse_page_source(html_content)
+                    page_results, entries = self.parse_page(driver)
+                    return page_results, self.check_next_page_exists(driver), entries
+            except WebDriverException as e:
+                print(f"Browser error on page {page_num} (attempt {attempt + 1}): {e.__class__.__name__}")
+                self.metrics.count("scraper_request_errors_total", kind="page_load", error=e.__class__.__name__)
+        
+        return None
+    
+    def record_page_metrics(self, driver):
+        """Add the transferred bytes and load time of the page a driver has loaded"""
+        metrics = page_metrics(driver)
+        with self.stats_lock:
+            self.loaded_pages += 1
+            self.transferred_bytes += metrics.get("transferred", 0)
+            self.page_requests += metrics.get("requests", 0)
+            self.page_load_ms += metrics.get("load_ms", 0)
+        
+        self.metrics.observe("scraper_request_seconds", metrics.get("load_ms", 0) / 1000, kind="page_load")
+        self.metrics.count("scraper_response_bytes_total", metrics.get("transferred", 0), kind="page_load")
+    
+    def print_page_metrics(self):
+        """Print the page load metrics of the crawl"""
+        if not self.loaded_pages:
+            return
+        
+        print(f"Loaded {self.loaded_pages} pages: {self.transferred_bytes / 1024 / 1024:.1f} MB transferred "
+              f"({self.transferred_bytes / self.loaded_pages / 1024:.0f} KB, {self.page_requests / self.loaded_pages:.0f} requests "
+              f"and {self.page_load_ms / self.loaded_pages:.0f} ms to DOM ready per page)")
+    
+    def save_checkpoint(self, last_completed_page):
+        """Record the crawl progress after a completed page"""
+        if not self.checkpoint:
+            return
+        
+        self.checkpoint.save({
+            "start_page": self.start_page,
+            "last_completed_page": last_completed_page,
+            "total_entries": self.total_entries,
+            "skipped_entries": self.skipped_entries,
+            "sink_size": self.sink.size() if self.sink else None,
+            "sink_count": self.sink.count if self.sink else None
+        })
+    
+    def restore_checkpoint(self):
+        """Restore the counters and the stream from the checkpoint, returns None if there is none"""
+        state = self.checkpoint.load() if self.checkpoint else None
+        if not state:
+            print("No checkpoint found, starting from the beginning")
+            # The sink was opened for appending, drop the clips of the previous run
+            if self.sink:
+                self.sink.truncate(0, 0)
+            return None
+        
+        self.total_entries = state["total_entries"]
+        self.skipped_entries = state["skipped_entries"]
+        
+        if self.sink and state["sink_size"] is not None:
+            # Drop anything streamed after the checkpoint was written, it will be scraped again
+            self.sink.truncate(state["sink_size"], state["sink_count"])
+            self.seen = SeenClips(iter_json_lines(self.sink.path))
+        elif not self.sink:
+            print("Warning: resuming without a sink, clips scraped before the checkpoint are not included")
+        
+        print(f"Resuming after page {state['last_completed_page']}")
+        return state
+    
+    def scrape(self, start_page=1, max_pages=None, resume=False):
+        """Scrape clips from tracker.gg, starting from start_page
+
+        With resume=True the crawl continues after the last page of the checkpoint.
+        """
         try:
             current_page = start_page
             has_next_page = True
             
-            while has_next_page:
-                print(f"Scraping page {current_page}...")
-                
-                # Navigate to the page
-                if not self.navigate_to_page(current_page):
-                    print(f"Failed to navigate to page {current_page}, stopping")
-                    break
-                
-                # Save the page source for debugging
-                with open(f"output/page_{current_page}_selenium.html", "w", encoding="utf-8") as f:
-                    f.write(self.driver.page_source)
-                
-                # Parse the page and extract clip data
-                page_results = self.parse_page()
-                self.results.extend(page_results)
-                
-                print(f"Found {len(page_results)} clips on page {current_page}")
-                
-                # Check if there's a next page
-                has_next_page = self.check_next_page_exists()
-                
-                # Stop if we've reached the maximum number of pages
-                if max_pages and current_page >= start_page + max_pages - 1:
-                    break
+            if resume:
+                state = self.restore_checkpoint()
+                if state:
+                    start_page = state["start_page"]
+                    current_page = state["last_completed_page"] + 1
+            
+            self.start_page = start_page
+            last_page = start_page + max_pages - 1 if max_pages else None
+            
+            with ThreadPoolExecutor(max_workers=self.pool.size) as executor:
+                while has_next_page and (last_page is None or current_page <= last_page):
+                    # Load the next batch of pages concurrently, one per pooled driver
+                    batch_end = current_page + self.pool.size - 1
+                    if last_page is not None:
+                        batch_end = min(batch_end, last_page)
+                    batch = list(range(current_page, batch_end + 1))
+                    print(f"Scraping pages {batch[0]}-{batch[-1]}...")
+                    futures = [executor.submit(self.load_page, page_num) for page_num in batch]
+                    
+                    # Collect the pages in order, stopping at the last page; only the kept pages are counted
+                    for page_num, future in zip(batch, futures):
+                        page = future.result()
+                        if page is None:
+                            # Keep the checkpoint so the crawl can be resumed from this page
+                            print(f"Failed to navigate to page {page_num}, stopping")
+                            return self.results
+                        
+                        page_results, has_next_page, entries = page
+                        self.count_entries(entries, page_results)
+                        self.add_results(page_results)
+                        self.save_checkpoint(page_num)
+                        
+                        print(f"Found {len(page_results)} clips on page {page_num}")
+                        
+                        if not has_next_page:
+                            break
                     
-                # Move to the next page
-                current_page += 1
-                
-                # Add a delay to avoid overloading the server
-                time.sleep(random.uniform(2, 5))
+                    # Move to the next batch (the rate limiter spaces out the page loads)
+                    current_page = batch_end + 1
+            
+            # The crawl is complete, a later run should start from scratch
+            if self.checkpoint:
+                self.checkpoint.clear()
+            
+            if self.seen.duplicates > 0:
+                print(f"Dropped {self.seen.duplicates} duplicate clips repeated by the shifting listing")
             
             return self.results
         
         finally:
-            # Always close the driver when done
-            self.driver.quit()
+            # Always close the drivers when done
+            self.pool.close()
+            self.print_page_metrics()
     
-    def save_to_json(self, filename="tracker_clips_selenium.json"):
-        """Save the results to a JSON file"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.results, f, indent=4, ensure_ascii=False)
+    def save_to_json(self, filename="tracker_clips_selenium.json", compact=False):
+        """Save the results to a JSON file (minified with compact, compressed if it ends in .gz or .zst)"""
+        # Streaming mode: build the file from the stream without loading it
+        if self.sink:
+            count = self.sink.finalize(filename, compact=compact)
+            print(f"Saved {count} clips to {filename}")
+            return
+        
+        write_clips_json(filename, self.results, compact=compact)
         print(f"Saved {len(self.results)} clips to {filename}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Valorant guide clips from tracker.gg with Selenium")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream clips to output/tracker_clips_selenium.jsonl as they are scraped")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted --stream crawl from output/selenium_checkpoint.json")
+    parser.add_argument("--browsers", type=int, default=1, help="number of browsers loading pages in parallel")
+    parser.add_argument("--parser", default="auto", choices=["auto", "selectolax", "lxml", "html.parser"],
+                        help="HTML parser backend for the rendered pages")
+    parser.add_argument("--extract", default="page_source", choices=["page_source", "elements"],
+                        help="parse the page source once (default) or query every tile over WebDriver")
+    parser.add_argument("--no-block", action="store_true",
+                        help="load images, fonts and media too (compare the transferred bytes with a blocking run)")
+    parser.add_argument("--allow", nargs="*", default=[],
+                        help='resource types ("image", "font", "media") or URL patterns to load despite blocking')
+    parser.add_argument("--compact", action="store_true", help="write minified JSON instead of indented JSON")
+    parser.add_argument("--compress", choices=["gzip", "zstd"],
+                        help="compress the output (.gz or .zst appended to the file name, zstd needs zstandard)")
+    parser.add_argument("--report", default="output/run_report.json",
+                        help="JSON run report with request latencies, bytes, parse times, retries and skip reasons")
+    parser.add_argument("--prometheus", default=None, help="also write the metrics to this Prometheus text file")
+    args = parser.parse_args()
+    
     # Create output directory if it doesn't exist
     os.makedirs("output", exist_ok=True)
     
     # Create the scraper (set headless=False to see the browser in action)
-    scraper = SeleniumTrackerScraper(headless=True)
+    # Resuming needs the clips streamed before the interruption, so it always streams
+    sink = JsonLinesSink("output/tracker_clips_selenium.jsonl", append=args.resume) if args.stream or args.resume else None
+    scraper = SeleniumTrackerScraper(
+        headless=True,
+        sink=sink,
+        checkpoint=Checkpoint("output/selenium_checkpoint.json"),
+        pool_size=args.browsers,
+        parser=args.parser,
+        extract=args.extract,
+        block_resources=not args.no_block,
+        allow=args.allow
+    )
     
     # Scrape the clips (optionally specify max_pages to limit the number of pages)
     # scraper.scrape(max_pages=5)  # Uncomment to limit to 5 pages
-    scraper.scrape()
+    scraper.scrape(resume=args.resume)
     
     # Save the results to a JSON file
-    scraper.save_to_json("output/tracker_clips_selenium.json")
+    scraper.save_to_json(with_compression("output/tracker_clips_selenium.json", args.compress), compact=args.compact)
+    
+    # Where the time went: network, Cloudflare (retries, throttling) or parsing
+    write_run_metrics(scraper, args.report, args.prometheus)
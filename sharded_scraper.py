@@ -0,0 +1,151 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from clip_store import SeenClips
+from retry import FetchError
+
+# Scraper class per method, imported lazily inside the worker processes
+SCRAPER_CLASSES = {
+    "api": ("api_scraper", "ApiScraper"),
+    "tracker": ("tracker_scraper", "TrackerScraper")
+}
+
+
+def create_scraper(method, scraper_kwargs=None):
+    """Create a scraper for method ("api" or "tracker") with its own HTTP session"""
+    module_name, class_name = SCRAPER_CLASSES[method]
+    module = __import__(module_name)
+    return getattr(module, class_name)(**(scraper_kwargs or {}))
+
+
+def scrape_shard(method, pages, scraper_kwargs=None, workers=1):
+    """Scrape a range of pages in a worker process, returns ([(page_num, clips, has_next), ...], failed pages)
+    
+    The scraper's per-host rate is split between workers processes, so
+    together they don't send more requests than one scraper would. A page that
+    keeps failing ends the shard; the pages scraped before it are kept and the
+    rest of the range is returned as failed.
+    """
+    scraper = create_scraper(method, scraper_kwargs)
+    scraper.rate_limiter.share(workers)
+    shard_results = []
+    
+    for index, page_num in enumerate(pages):
+        print(f"[shard {pages[0]}-{pages[-1]}] Scraping page {page_num}...")
+        try:
+            page_results, has_next = scraper.scrape_page(page_num)
+        except FetchError as e:
+            print(f"[shard {pages[0]}-{pages[-1]}] Stopping at page {page_num}: {e}")
+            return shard_results, pages[index:]
+        shard_results.append((page_num, page_results, has_next))
+    
+    return shard_results, []
+
+
+def scrape_tail(method, page_num, scraper_kwargs=None):
+    """Scrape from page_num on until the listing ends, in the same format as scrape_shard"""
+    scraper = create_scraper(method, scraper_kwargs)
+    tail_results = []
+    
+    while True:
+        print(f"[tail] Scraping page {page_num}...")
+        try:
+            page_results, has_next = scraper.scrape_page(page_num)
+        except FetchError as e:
+            print(f"[tail] Stopping at page {page_num}: {e}")
+            return tail_results, [page_num]
+        tail_results.append((page_num, page_results, has_next))
+        if not page_results or has_next is False:
+            return tail_results, []
+        page_num += 1
+
+
+def split_pages(start_page, end_page, shards):
+    """Split start_page..end_page into at most shards contiguous ranges"""
+    pages = list(range(start_page, end_page + 1))
+    size = max(1, -(-len(pages) // shards))
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+
+def merge_shards(shard_results):
+    """Merge shard outputs by page order and drop clips seen on an earlier page"""
+    results = []
+    seen = SeenClips()
+    pages = sorted((page for shard in shard_results for page in shard), key=lambda page: page[0])
+    
+    for page_num, page_results, _ in pages:
+        results.extend(seen.filter(page_results))
+    
+    return results
+
+
+def scrape_sharded(method="tracker", start_page=1, total_pages=None, workers=4, scraper_kwargs=None):
+    """Scrape all pages with a pool of worker processes.
+
+    If total_pages is not given it is probed from the pagination of the first
+    page. The pagination of the listing may only show a window of page numbers,
+    so the probe can undercount; if the last probed page still has a next page,
+    the pages after it are scraped one by one until the listing ends.
+    scraper_kwargs are passed to the scraper of every worker and must be
+    picklable (e.g. no HttpCache instances). Pages a shard gave up on are
+    retried once the shards are done; if they still fail the run is reported
+    as incomplete.
+    """
+    probed = total_pages is None
+    if probed:
+        total_pages = create_scraper(method, scraper_kwargs).probe_total_pages()
+        if not total_pages:
+            print("Could not determine the total number of pages")
+            return []
+        print(f"Found {total_pages} pages")
+    
+    shards = split_pages(start_page, total_pages, workers)
+    if not shards:
+        print(f"No pages to scrape from page {start_page} ({total_pages} pages)")
+        return []
+    print(f"Scraping pages {start_page}-{total_pages} in {len(shards)} shards")
+    
+    with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        futures = [executor.submit(scrape_shard, method, pages, scraper_kwargs, len(shards)) for pages in shards]
+        shard_outputs = [future.result() for future in futures]
+    shard_results = [pages for pages, _ in shard_outputs]
+    failed_pages = [page_num for _, failed in shard_outputs for page_num in failed]
+    
+    # The other shards are done, retry the failed pages at the full rate
+    if failed_pages:
+        print(f"Retrying the {len(failed_pages)} pages the shards gave up on")
+        retried_results, failed_pages = scrape_shard(method, failed_pages, scraper_kwargs)
+        shard_results.append(retried_results)
+    
+    # A next button on the last probed page means the pagination undercounted
+    last_page = next((page for shard in shard_results for page in shard if page[0] == total_pages), None)
+    if probed and last_page and last_page[1] and last_page[2]:
+        print(f"Page {total_pages} still has a next page, scraping the pages after it")
+        tail_results, tail_failed = scrape_tail(method, total_pages + 1, scraper_kwargs)
+        shard_results.append(tail_results)
+        failed_pages += tail_failed
+    
+    results = merge_shards(shard_results)
+    print(f"Merged {len(results)} clips from {len(shards)} shards")
+    if failed_pages:
+        print(f"Incomplete run: the clips of pages {', '.join(map(str, failed_pages))} are missing")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape tracker.gg clips with several processes in parallel")
+    parser.add_argument("--method", default="tracker", choices=sorted(SCRAPER_CLASSES))
+    parser.add_argument("--workers", type=int, default=4, help="number of worker processes")
+    parser.add_argument("--pages", type=int, default=None,
+                        help="total number of pages (probed from the first page if omitted)")
+    args = parser.parse_args()
+    
+    # Create output directory if it doesn't exist
+    os.makedirs("output", exist_ok=True)
+    
+    results = scrape_sharded(args.method, total_pages=args.pages, workers=args.workers)
+    
+    # Save through a scraper so the usual output format and versioning apply
+    scraper = create_scraper(args.method)
+    scraper.results = results
+    scraper.save_to_json("output/tracker_clips.json")
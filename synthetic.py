@@ -0,0 +1,136 @@
+import html
+import random
+from clip import Clip
+from tag_classifier import AGENT_IDS, MAP_IDS, TEAM_IDS, classify_tags
+
+# Tags that are neither a map, a team nor an agent
+EXTRA_TAGS = ["Smoke", "Flash", "Lineup", "Wallbang", "One Way", "Post Plant", "Retake", "Ult", "Molly", "Recon"]
+
+# How the tags of the synthetic clips are drawn (see clip_tags)
+TAG_DISTRIBUTIONS = ("uniform", "skewed", "messy")
+
+# Synthetic clips get their own Cloudflare Stream customer, like the real thumbnails
+THUMBNAIL_URL = "https://customer-synthetic.cloudflarestream.com/{}/thumbnails/thumbnail.jpg"
+VIDEO_URL = "https://iframe.videodelivery.net/{}"
+
+
+def video_id(clip_id):
+    """Cloudflare Stream video ID of a synthetic clip"""
+    return f"{clip_id:032x}"
+
+
+def pick(rng, names, distribution):
+    """One of names, the first ones far more often than the rest if the distribution is skewed"""
+    if distribution == "skewed":
+        return rng.choices(names, weights=[1 / (rank + 1) ** 2 for rank in range(len(names))])[0]
+    return rng.choice(names)
+
+
+def clip_tags(clip_id, distribution="uniform"):
+    """Tags of a synthetic clip: a map, usually a team and an agent, and a few other tags
+    
+    The same clip_id always gets the same tags, so listing, detail and API pages
+    agree. "uniform" draws every tag equally often, "skewed" makes a few maps,
+    agents and tags dominate like on the real site, and "messy" adds odd casing,
+    whitespace and one-off tags for the tag normalization to deal with.
+    """
+    if distribution not in TAG_DISTRIBUTIONS:
+        raise ValueError(f"Unknown tag distribution: {distribution}")
+    
+    rng = random.Random(clip_id)
+    tags = [pick(rng, list(MAP_IDS), distribution)]
+    if rng.random() < 0.9:
+        tags.append(pick(rng, list(TEAM_IDS), distribution))
+    if rng.random() < 0.95:
+        tags.append(pick(rng, list(AGENT_IDS), distribution))
+    for _ in range(rng.randint(0, 3)):
+        tag = pick(rng, EXTRA_TAGS, distribution)
+        if tag not in tags:
+            tags.append(tag)
+    
+    if distribution == "messy":
+        tags = [rng.choice([tag, tag.lower(), tag.upper(), f" {tag} "]) for tag in tags]
+        if rng.random() < 0.3:
+            tags.append(f"tag{rng.randrange(100000)}")
+    return tags
+
+
+def page_clip_ids(page_num, clips_per_page):
+    """IDs of the clips on a listing page, the listing is numbered from page 1"""
+    return range((page_num - 1) * clips_per_page, page_num * clips_per_page)
+
+
+def tile_html(clip_id, distribution="uniform"):
+    """A guide tile of the listing as tracker.gg serves it (before the player is rendered)"""
+    badges = "".join(f'<span class="badge">{html.escape(tag)}</span>' for tag in clip_tags(clip_id, distribution))
+    return (
+        f'<div class="guide-tile">'
+        f'<div class="guide-tile__video"><img src="{THUMBNAIL_URL.format(video_id(clip_id))}"/></div>'
+        f'<p class="guide-tile__title"><a href="/valorant/guides/clips/{clip_id}">Clip {clip_id}</a></p>'
+        f'<div class="guide-tile__badges">{badges}</div>'
+        f'<span class="guide-tile__author">By <a>author{clip_id % 97}</a></span>'
+        f'</div>'
+    )
+
+
+def listing_html(page_num, clips_per_page=24, pages=10, distribution="uniform"):
+    """A listing page with its tiles, pagination and next button; pages after the last one are empty"""
+    tiles = ""
+    if page_num <= pages:
+        tiles = "".join(tile_html(clip_id, distribution) for clip_id in page_clip_ids(page_num, clips_per_page))
+    next_button = "<button disabled>Next</button>" if page_num >= pages else "<button>Next</button>"
+    pagination = f'<a aria-current="page">{page_num}</a><a>{pages}</a>' if page_num <= pages else ""
+    return f"<html><body><main>{tiles}</main><nav>{pagination}{next_button}</nav></body></html>"
+
+
+def detail_html(clip_id):
+    """The detail page of a clip with its player iframe"""
+    return (
+        f"<html><body><h1>Clip {clip_id}</h1>"
+        f'<iframe src="{VIDEO_URL.format(video_id(clip_id))}"></iframe>'
+        f"</body></html>"
+    )
+
+
+def api_clip(clip_id, distribution="uniform"):
+    """A clip as the tracker.gg API returns it"""
+    return {
+        "id": str(clip_id),
+        "title": f"Clip {clip_id}",
+        "description": f"Synthetic clip {clip_id}",
+        "tags": [{"name": tag} for tag in clip_tags(clip_id, distribution)],
+        "videoUrl": VIDEO_URL.format(video_id(clip_id)),
+        "thumbnailUrl": THUMBNAIL_URL.format(video_id(clip_id)),
+        "author": {"name": f"author{clip_id % 97}"}
+    }
+
+
+def api_page(page_num, clips_per_page=24, pages=10, distribution="uniform"):
+    """An API response page; pages after the last one have no items"""
+    items = []
+    if page_num <= pages:
+        items = [api_clip(clip_id, distribution) for clip_id in page_clip_ids(page_num, clips_per_page)]
+    return {
+        "data": {
+            "items": items,
+            "pagination": {"currentPage": page_num, "totalPages": pages}
+        }
+    }
+
+
+def corpus(count, distribution="uniform", site_url="https://tracker.gg"):
+    """Yield count scraped clips as clip.Clip records, like the API scraper builds them"""
+    for clip_id in range(count):
+        map_id, team_id, agent_id, clean_tags = classify_tags(clip_tags(clip_id, distribution))
+        yield Clip(
+            title=f"Clip {clip_id}",
+            description=f"Synthetic clip {clip_id}",
+            tags=clean_tags,
+            map_id=map_id,
+            team_id=team_id,
+            agent_id=agent_id,
+            video_url=VIDEO_URL.format(video_id(clip_id)),
+            thumbnail_url=THUMBNAIL_URL.format(video_id(clip_id)),
+            author=f"author{clip_id % 97}",
+            source_url=f"{site_url}/valorant/guides/clips/{clip_id}"
+        )
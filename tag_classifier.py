@@ -0,0 +1,84 @@
+# Agent ID mapping
+AGENT_IDS = {
+    "Astra": "41fb69c1-4189-7b37-f117-bcaf1e96f1bf",
+    "Breach": "5f8d3a7f-467b-97f3-062c-13acf203c006",
+    "Brimstone": "9f0d8ba9-4140-b941-57d3-a7ad57c6b417",
+    "Chamber": "22697a3d-45bf-8dd7-4fec-84a9e28c69d7",
+    "Clove": "1dbf2edd-4729-0984-3115-daa5eed44993",
+    "Cypher": "117ed9e3-49f3-6512-3ccf-0cada7e3823b",
+    "Deadlock": "cc8b64c8-4b25-4ff9-6e7f-37b4da43d235",
+    "Fade": "dade69b4-4f5a-8528-247b-219e5a1facd6",
+    "Gekko": "e370fa57-4757-3604-3648-499e1f642d3f",
+    "Harbor": "95b78ed7-4637-86d9-7e41-71ba8c293152",
+    "Iso": "0e38b510-41a8-5780-5e8f-568b2a4f2d6c",
+    "Jett": "add6443a-41bd-e414-f6ad-e58d267f4e95",
+    "KAY/O": "601dbbe7-43ce-be57-2a40-4abd24953621",
+    "Killjoy": "1e58de9c-4950-5125-93e9-a0aee9f98746",
+    "Neon": "bb2a4828-46eb-8cd1-e765-15848195d751",
+    "Omen": "8e253930-4c05-31dd-1b6c-968525494517",
+    "Phoenix": "eb93336a-449b-9c1b-0a54-a891f7921d69",
+    "Raze": "f94c3b30-42be-e959-889c-5aa313dba261",
+    "Reyna": "a3bfb853-43b2-7238-a4f1-ad90e9e46bcc",
+    "Sage": "569fdd95-4d10-43ab-ca70-79becc718b46",
+    "Skye": "6f2a04ca-43e0-be17-7f36-b3908627744d",
+    "Sova": "320b2a48-4d9b-a075-30f1-1f93a9b638fa",
+    "Tejo": "b444168c-4e35-8076-db47-ef9bf368f384",
+    "Viper": "707eab51-4836-f488-046a-cda6bf494859",
+    "Vyse": "efba5359-4016-a1e5-7626-b1ae76895940",
+    "Yoru": "7f94d92c-4234-0a36-9646-3a87eb8b5c89"
+}
+
+# Map ID mapping
+MAP_IDS = {
+    "Abyss": "Infinity",
+    "Ascent": "Ascent",
+    "Bind": "Duality",
+    "Breeze": "Foxtrot",
+    "Fracture": "Canyon",
+    "Haven": "Triad",
+    "Icebox": "Port",
+    "Lotus": "Jam",
+    "Sunset": "Juliett",
+    "Split": "Bonsai",
+    "Pearl": "Pitt"
+}
+
+# Team ID mapping
+TEAM_IDS = {
+    "Attack": "Red",
+    "Defense": "Blue"
+}
+
+# Output field of each kind of tag
+MAP, TEAM, AGENT = "mapID", "teamID", "agentID"
+
+
+def normalize_tag(tag):
+    """Lookup key of a tag, so "attack", "Attack " and "ATTACK" are the same tag"""
+    return tag.strip().casefold()
+
+
+# Normalized tag -> (field, ID), built once for all scrapers
+TAG_LOOKUP = {}
+for field, ids in ((MAP, MAP_IDS), (TEAM, TEAM_IDS), (AGENT, AGENT_IDS)):
+    for name, tag_id in ids.items():
+        TAG_LOOKUP[normalize_tag(name)] = (field, tag_id)
+
+
+def classify_tags(tags):
+    """Split the tags of a clip in one pass
+
+    Returns (map_id, team_id, agent_id, clean_tags). Each ID is taken from the
+    first matching tag and is "" if there is none; clean_tags are the remaining
+    tags in their original order and spelling.
+    """
+    found = {}
+    clean_tags = []
+    for tag in tags:
+        match = TAG_LOOKUP.get(normalize_tag(tag))
+        if match is None:
+            clean_tags.append(tag)
+        elif match[0] not in found:
+            found[match[0]] = match[1]
+
+    return found.get(MAP, ""), found.get(TEAM, ""), found.get(AGENT, ""), clean_tags
@@ -1,16 +1,32 @@
-import requests
-from bs4 import BeautifulSoup
-import json
-import time
 import random
-import re
 import os
+import threading
+import argparse
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
 import cloudscraper  # Added for bypassing Cloudflare protection
+from rate_limiter import AdaptiveRateLimiter, HostRateLimiter, RateLimitedSession
+from retry import FetchError, RetryPolicy
+from http_cache import HttpCache
+from clip_store import SeenClips, load_known_keys, load_previous_clips, merge_clips
+from html_parsers import get_parser, thumbnail_video_url
+from jsonl_sink import JsonLinesSink, iter_json_lines, write_clips_json
+from checkpoint import Checkpoint
+from tag_classifier import classify_tags
+from clip_index import ClipIndex
+from clip import Clip, clip_key
+from output_file import read_version, with_compression
+from run_metrics import RunMetrics, write_run_metrics
+
+# Listing pages of the clips, clip detail links are resolved against its origin
+BASE_URL = "https://tracker.gg/valorant/guides/clips"
 
 class TrackerScraper:
-    def __init__(self):
-        self.base_url = "https://tracker.gg/valorant/guides/clips"
+    def __init__(self, max_workers=8, requests_per_second=4, fast_path=False, verify_percent=0, cache=None,
+                 parser="auto", sink=None, checkpoint=None, rate_limiter=None, retry_policy=None, index=None,
+                 base_url=BASE_URL, metrics=None):
+        # Point base_url at a replay_server.ReplayServer to scrape without the network
+        self.base_url = base_url
         # Use cloudscraper to bypass Cloudflare protection
         self.scraper = cloudscraper.create_scraper(
             browser={
@@ -30,271 +46,287 @@ class TrackerScraper:
             "Cache-Control": "max-age=0"
         }
         
-        # Agent ID mapping
-        self.agent_ids = {
-            "Astra": "41fb69c1-4189-7b37-f117-bcaf1e96f1bf",
-            "Breach": "5f8d3a7f-467b-97f3-062c-13acf203c006",
-            "Brimstone": "9f0d8ba9-4140-b941-57d3-a7ad57c6b417",
-            "Chamber": "22697a3d-45bf-8dd7-4fec-84a9e28c69d7",
-            "Clove": "1dbf2edd-4729-0984-3115-daa5eed44993",
-            "Cypher": "117ed9e3-49f3-6512-3ccf-0cada7e3823b",
-            "Deadlock": "cc8b64c8-4b25-4ff9-6e7f-37b4da43d235",
-            "Fade": "dade69b4-4f5a-8528-247b-219e5a1facd6",
-            "Gekko": "e370fa57-4757-3604-3648-499e1f642d3f",
-            "Harbor": "95b78ed7-4637-86d9-7e41-71ba8c293152",
-            "Iso": "0e38b510-41a8-5780-5e8f-568b2a4f2d6c",
-            "Jett": "add6443a-41bd-e414-f6ad-e58d267f4e95",
-            "KAY/O": "601dbbe7-43ce-be57-2a40-4abd24953621",
-            "Killjoy": "1e58de9c-4950-5125-93e9-a0aee9f98746",
-            "Neon": "bb2a4828-46eb-8cd1-e765-15848195d751",
-            "Omen": "8e253930-4c05-31dd-1b6c-968525494517",
-            "Phoenix": "eb93336a-449b-9c1b-0a54-a891f7921d69",
-            "Raze": "f94c3b30-42be-e959-889c-5aa313dba261",
-            "Reyna": "a3bfb853-43b2-7238-a4f1-ad90e9e46bcc",
-            "Sage": "569fdd95-4d10-43ab-ca70-79becc718b46",
-            "Skye": "6f2a04ca-43e0-be17-7f36-b3908627744d",
-            "Sova": "320b2a48-4d9b-a075-30f1-1f93a9b638fa",
-            "Tejo": "b444168c-4e35-8076-db47-ef9bf368f384",
-            "Viper": "707eab51-4836-f488-046a-cda6bf494859",
-            "Vyse": "efba5359-4016-a1e5-7626-b1ae76895940",
-            "Yoru": "7f94d92c-4234-0a36-9646-3a87eb8b5c89"
-        }
+        # Detail pages are fetched by a bounded worker pool. Listing and detail
+        # fetches share one adaptive per-host rate limiter starting at
+        # requests_per_second (None disables rate limiting)
+        self.max_workers = max_workers
+        if rate_limiter is None:
+            rate_limiter = AdaptiveRateLimiter(requests_per_second) if requests_per_second else HostRateLimiter(None)
+        self.rate_limiter = rate_limiter
         
-        # Map ID mapping
-        self.map_ids = {
-            "Abyss": "Infinity",
-            "Ascent": "Ascent",
-            "Bind": "Duality",
-            "Breeze": "Foxtrot",
-            "Fracture": "Canyon",
-            "Haven": "Triad",
-            "Icebox": "Port",
-            "Lotus": "Jam",
-            "Sunset": "Juliett",
-            "Split": "Bonsai",
-            "Pearl": "Pitt"
-        }
+        # Transient failures are retried with backoff, a per-host circuit breaker stops hammering a dead host
+        self.retry_policy = retry_policy or RetryPolicy()
         
-        # Team ID mapping
-        self.team_ids = {
-            "Attack": "Red",
-            "Defense": "Blue"
-        }
+        # Fast path: derive the video URL from the thumbnail and only fetch the
+        # detail page when that fails (or for verify_percent % of the clips)
+        self.fast_path = fast_path
+        self.verify_percent = verify_percent
+        
+        # HTML parser backend: "auto", "selectolax", "lxml" or "html.parser" (see html_parsers)
+        self.parser = get_parser(parser)
+        
+        # Optional http_cache.HttpCache shared by the listing and detail fetches
+        self.cache = cache
+        
+        # Request latencies, bytes, parse and detail fetch times and skip reasons (see run_metrics)
+        self.metrics = metrics or RunMetrics()
         
         self.results = []
+        
+        # Keys of the clips collected so far, the listing shifts during long crawls and repeats clips
+        self.seen = SeenClips()
+        
+        # Optional clip_index.ClipIndex the output is merged into (see save_to_json)
+        self.index = index
+        
+        # Optional jsonl_sink.JsonLinesSink: clips are streamed to disk instead of kept in self.results
+        self.sink = sink
+        
+        # Optional checkpoint.Checkpoint written after every page so a crawl can be resumed
+        self.checkpoint = checkpoint
+        self.start_page = 1
         self.skipped_entries = 0
         self.total_entries = 0
+        self.verified_entries = 0
+        self.verification_mismatches = 0
+        self.stats_lock = threading.Lock()
         
-    def get_agent_id(self, agent_name):
-        """Convert agent name to agent ID"""
-        return self.agent_ids.get(agent_name, "")
+        # Incremental mode: keys (see clip.clip_key) of the clips of the previous output (see load_known_clips)
+        self.known_keys = None
+        self.known_entries = 0
+        self.page_entries = 0
+        self.page_known_entries = 0
+        
+    def load_known_clips(self, filename):
+        """Enable incremental mode using the clips of a previous output file"""
+        self.known_keys = load_known_keys(filename)
+        print(f"Loaded {len(self.known_keys)} known clips from {filename}")
     
-    def get_map_id(self, map_name):
-        """Convert map name to map ID"""
-        return self.map_ids.get(map_name, "")
+    def add_results(self, page_results):
+        """Keep the clips of a page in memory, or stream them to the sink and flush
+        
+        Repeated clips were already dropped from the tiles (see listing_tiles).
+        """
+        self.metrics.count("scraper_clips_total", len(page_results))
+        if self.sink:
+            self.sink.write_many(page_results)
+            self.sink.flush()
+        else:
+            self.results.extend(page_results)
     
-    def get_team_id(self, team_name):
-        """Convert team name to team ID"""
-        return self.team_ids.get(team_name, "Neutral")
+    def http_get(self, url, url_class):
+        """GET a URL with the cloudscraper session, going through the cache if enabled"""
+        # Only requests that actually hit the network are rate limited
+        session = RateLimitedSession(self.scraper, self.rate_limiter, self.metrics, url_class)
+        if self.cache:
+            return self.cache.get(session, url, self.headers, url_class)
+        return session.get(url, headers=self.headers)
     
-    def clean_tags(self, tags):
-        """Remove map, team, and agent tags"""
-        clean_tags = []
+    def fetch(self, url, url_class):
+        """GET a URL with retries, raises retry.FetchError if it keeps failing
         
-        for tag in tags:
-            # Skip map tags
-            if tag in self.map_ids:
-                continue
-            
-            # Skip team tags (attack, defense)
-            if tag.lower() in ["attack", "defense"]:
-                continue
-            
-            # Skip agent tags
-            if tag in self.agent_ids:
-                continue
-            
-            # Add the tag to the clean tags list
-            clean_tags.append(tag)
+        Listing and detail pages have separate circuit breakers. The crawl
+        can't go on without the listing, so an open listing circuit is waited
+        out instead of failing fast.
+        """
+        def attempt():
+            response = self.http_get(url, url_class)
+            response.raise_for_status()
+            return response
         
-        return clean_tags
+        return self.retry_policy.call(url, attempt, url_class, wait=url_class == "listing")
     
     def fetch_page(self, page_num):
-        """Fetch a specific page of clips"""
+        """Fetch a specific page of clips
+
+        Raises retry.FetchError if the page can't be fetched, so a failed request
+        is never mistaken for an empty page at the end of the clips.
+        """
         url = f"{self.base_url}?page={page_num}"
         try:
             # Use cloudscraper instead of requests
-            response = self.scraper.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.text
-        except requests.exceptions.RequestException as e:
+            return self.fetch(url, "listing").text
+        except FetchError as e:
             print(f"Error fetching page {page_num}: {e}")
             # Add more detailed error information
-            if hasattr(e, 'response') and e.response:
-                print(f"Response status code: {e.response.status_code}")
-                print(f"Response headers: {e.response.headers}")
-            return None
+            response = getattr(e.__cause__, 'response', None)
+            if response is not None:
+                print(f"Response status code: {response.status_code}")
+                print(f"Response headers: {response.headers}")
+            raise
+    
+    def extract_tile(self, raw_tile):
+        """Turn a tile parsed by the HTML backend into the fields used to build a clip"""
+        self.total_entries += 1
+        
+        # Source URL from the title link (needed for fetching the video URL)
+        source_url = ""
+        if raw_tile["href"]:
+            source_url = urljoin(self.base_url, raw_tile["href"])
+        
+        return {
+            "title": raw_tile["title"],
+            "tags": raw_tile["tags"],
+            "source_url": source_url,
+            "thumbnail_url": raw_tile["thumbnail_url"],
+            "author": raw_tile["author"]
+        }
+    
+    def tile_key(self, tile):
+        """clip.clip_key of the clip a tile will become"""
+        return clip_key({"sourceURL": tile["source_url"], "thumbnailURL": tile["thumbnail_url"]})
+    
+    def video_url_from_thumbnail(self, thumbnail_url):
+        """Derive the iframe video URL from a cloudflarestream thumbnail URL"""
+        return thumbnail_video_url(thumbnail_url)
     
-    def parse_clip(self, clip_element):
-        """Parse a single clip element"""
+    def fetch_detail_video_url(self, source_url):
+        """Fetch the clip detail page and extract the video URL from it"""
+        video_url = ""
+        if not source_url:
+            return video_url
+        
         try:
-            self.total_entries += 1
-            
-            # Extract title - updated selector
-            title_element = clip_element.find("p", class_="guide-tile__title")
-            if title_element and title_element.find("a"):
-                title = title_element.find("a").text.strip()
-            else:
-                title = ""
-            
-            # Extract description - leave empty if not found
-            description = ""
-            
-            # Extract tags from badges
-            badges_element = clip_element.find("div", class_="guide-tile__badges")
-            tags = []
-            if badges_element:
-                badge_elements = badges_element.find_all("span", class_="badge")
-                tags = [tag.text.strip() for tag in badge_elements]
-            
-            # Extract map ID from tags
-            map_id = ""
-            for tag in tags:
-                if tag in self.map_ids:
-                    map_id = self.get_map_id(tag)
-                    break
-            
-            # Extract team ID from tags (convert "attack" or "defense" to proper case)
-            team_id = "Neutral"
-            for tag in tags:
-                tag_lower = tag.lower()
-                if tag_lower == "attack":
-                    team_id = self.get_team_id("Attack")
-                    break
-                elif tag_lower == "defense":
-                    team_id = self.get_team_id("Defense")
-                    break
-            
-            # Extract agent ID from tags
-            agent_id = ""
-            for tag in tags:
-                if tag in self.agent_ids:
-                    agent_id = self.get_agent_id(tag)
-                    break
+            # Fetch the clip detail page to get the iframe (including retries and cache hits)
+            with self.metrics.timer("scraper_detail_fetch_seconds"):
+                detail_response = self.fetch(source_url, "detail")
             
-            # Clean tags (remove map, team, agent)
-            clean_tags = self.clean_tags(tags)
-            
-            # Extract source URL from the title link (needed for fetching the video URL)
-            source_url = ""
-            if title_element and title_element.find("a") and title_element.find("a").get("href"):
-                source_url = "https://tracker.gg" + title_element.find("a")["href"]
-            
-            # Extract thumbnail URL from the img element in guide-tile__video
-            thumbnail_url = ""
-            video_div = clip_element.find("div", class_="guide-tile__video")
-            if video_div:
-                img_element = video_div.find("img")
-                if img_element and img_element.get("src"):
-                    thumbnail_url = img_element["src"]
-            
-            # Extract video URL - try to get the iframe URL if possible
-            video_url = ""
-            if source_url:
-                try:
-                    # Fetch the clip detail page to get the iframe
-                    detail_response = self.scraper.get(source_url, headers=self.headers)
-                    if detail_response.status_code == 200:
-                        detail_soup = BeautifulSoup(detail_response.text, 'html.parser')
-                        
-                        # Look for iframe with videodelivery.net URL
-                        iframe = detail_soup.find("iframe", src=lambda s: s and "videodelivery.net" in s)
-                        if iframe and iframe.get("src"):
-                            video_url = iframe["src"]
-                        
-                        # If iframe not found, look for a video element
-                        if not video_url:
-                            video_element = detail_soup.find("video", src=lambda s: s and "cloudflarestream" in s)
-                            if video_element and video_element.get("src"):
-                                video_url = video_element["src"]
-                    
-                    # If we still don't have a video URL, try to extract it from the thumbnail
-                    if not video_url and thumbnail_url:
-                        import re
-                        video_id_match = re.search(r'cloudflarestream\.com/([^/]+)/', thumbnail_url)
-                        if video_id_match:
-                            video_id = video_id_match.group(1)
-                            # Try the iframe format
-                            video_url = f"https://iframe.videodelivery.net/{video_id}"
-                
-                except Exception as e:
-                    print(f"Error fetching detail page: {e}")
-            
-            # If we still don't have a video URL, skip this entry
+            # Look for an iframe with a videodelivery.net URL, then for a cloudflarestream video element
+            with self.metrics.timer("scraper_parse_seconds", kind="detail"):
+                video_url = self.parser.parse_detail(detail_response.text)
+        
+        except Exception as e:
+            print(f"Error fetching detail page: {e}")
+        
+        return video_url
+    
+    def verify_video_url(self, source_url, derived_url):
+        """Check a thumbnail-derived video URL against the clip detail page"""
+        detail_url = self.fetch_detail_video_url(source_url)
+        with self.stats_lock:
+            self.verified_entries += 1
+            if detail_url and detail_url != derived_url:
+                self.verification_mismatches += 1
+                print(f"Derived video URL mismatch for {source_url}: {derived_url} != {detail_url}")
+        
+        # Trust the detail page over the thumbnail when they disagree
+        return detail_url or derived_url
+    
+    def fetch_video_url(self, source_url, thumbnail_url=""):
+        """Get the video URL of a clip, fetching the detail page only when needed"""
+        derived_url = self.video_url_from_thumbnail(thumbnail_url)
+        
+        # Fast path: the thumbnail already tells us the video ID
+        if self.fast_path and derived_url:
+            if self.verify_percent and random.uniform(0, 100) < self.verify_percent:
+                return self.verify_video_url(source_url, derived_url)
+            return derived_url
+        
+        # Otherwise download the detail page, falling back to the thumbnail
+        return self.fetch_detail_video_url(source_url) or derived_url
+    
+    def fetch_video_urls(self, tiles):
+        """Fetch the video URLs for a list of tiles, preserving listing order"""
+        if self.max_workers <= 1 or len(tiles) <= 1:
+            return [self.fetch_video_url(tile["source_url"], tile["thumbnail_url"]) for tile in tiles]
+        
+        # Fan the detail fetches out over a bounded pool sharing the cloudscraper session;
+        # map() yields the results in submission order, i.e. listing order
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tiles))) as executor:
+            return list(executor.map(
+                lambda tile: self.fetch_video_url(tile["source_url"], tile["thumbnail_url"]),
+                tiles
+            ))
+    
+    def build_clip(self, tile, video_url):
+        """Build the Clip from the tile fields and the video URL"""
+        try:
+            # If we don't have a video URL, skip this entry
             if not video_url:
                 self.skipped_entries += 1
+                self.metrics.count("scraper_skipped_clips_total", reason="no_video_url")
                 return None
             
-            # Extract author from guide-tile__author
-            author_element = clip_element.find("span", class_="guide-tile__author")
-            author = ""
-            if author_element:
-                author_text = author_element.text.strip()
-                if "By" in author_text:
-                    author = author_text.replace("By", "").strip()
-                    # If there's an anchor tag, use that text instead
-                    author_link = author_element.find("a")
-                    if author_link:
-                        author = author_link.text.strip()
+            tags = tile["tags"]
             
-            # Create clip data dictionary
-            clip_data = {
-                "title": title,
-                "tags": clean_tags
-            }
+            # Extract description - leave empty if not found
+            description = ""
             
-            # Only add description if it's not empty
-            if description:
-                clip_data["description"] = description
+            # Split the tags into map, team, agent and the remaining tags
+            map_id, team_id, agent_id, clean_tags = classify_tags(tags)
             
-            # Only add non-empty fields
-            if map_id:
-                clip_data["mapID"] = map_id
-            if team_id != "Neutral":
-                clip_data["teamID"] = team_id
-            if agent_id:
-                clip_data["agentID"] = agent_id
-            if video_url:
-                clip_data["videoURL"] = video_url
-            if thumbnail_url:
-                clip_data["thumbnailURL"] = thumbnail_url
-            if author:
-                clip_data["author"] = author
-            if source_url:
-                clip_data["sourceURL"] = source_url
-                
-            return clip_data
+            # Empty fields are left out of the output by Clip.to_dict()
+            return Clip(
+                title=tile["title"],
+                description=description,
+                tags=clean_tags,
+                map_id=map_id,
+                team_id=team_id,
+                agent_id=agent_id,
+                video_url=video_url,
+                thumbnail_url=tile["thumbnail_url"],
+                author=tile["author"],
+                source_url=tile["source_url"]
+            )
             
         except Exception as e:
             print(f"Error parsing clip: {e}")
             self.skipped_entries += 1
+            self.metrics.count("scraper_skipped_clips_total", reason="error")
             return None
     
+    def parse_clip(self, raw_tile):
+        """Parse a single tile from a ListingPage"""
+        tile = self.extract_tile(raw_tile)
+        
+        video_url = self.fetch_video_url(tile["source_url"], tile["thumbnail_url"])
+        return self.build_clip(tile, video_url)
+    
     def parse_page(self, html_content):
         """Parse the HTML content of a page and extract clip data"""
         if not html_content:
             return []
         
-        soup = BeautifulSoup(html_content, 'html.parser')
-        # Updated class name from guide-card to guide-tile
-        clip_elements = soup.find_all("div", class_="guide-tile")
+        return self.parse_listing(self.parse_html(html_content))
+    
+    def parse_html(self, html_content):
+        """Parse a listing page with the HTML backend, recording the parse time"""
+        with self.metrics.timer("scraper_parse_seconds", kind="listing"):
+            return self.parser.parse_listing(html_content)
+    
+    def parse_listing(self, page):
+        """Extract clip data from an already parsed ListingPage"""
+        return self.process_tiles(self.listing_tiles(page))
+    
+    def listing_tiles(self, page):
+        """Extract the tiles of a ListingPage that still have to be scraped"""
+        clip_elements = page.tiles
         
         # Debug information
         print(f"Found {len(clip_elements)} clip elements on the page")
         
+        # Extract the listing fields first, then fetch all detail pages concurrently
+        tiles = [self.extract_tile(clip_element) for clip_element in clip_elements]
+        
+        # Incremental mode: drop clips we already have before fetching their detail pages
+        self.page_entries = len(tiles)
+        self.page_known_entries = 0
+        if self.known_keys is not None:
+            new_tiles = [tile for tile in tiles if self.tile_key(tile) not in self.known_keys]
+            self.page_known_entries = len(tiles) - len(new_tiles)
+            self.known_entries += self.page_known_entries
+            tiles = new_tiles
+        
+        # Drop the clips the shifting listing repeats before fetching their detail pages
+        return self.seen.filter(tiles, self.tile_key)
+    
+    def process_tiles(self, tiles):
+        """Fetch the video URLs of the tiles concurrently and build their clips"""
+        video_urls = self.fetch_video_urls(tiles)
+        
         page_results = []
-        for clip_element in clip_elements:
-            clip_data = self.parse_clip(clip_element)
+        for tile, video_url in zip(tiles, video_urls):
+            clip_data = self.build_clip(tile, video_url)
             if clip_data:
                 page_results.append(clip_data)
                 
@@ -305,93 +337,258 @@ class TrackerScraper:
         if not html_content:
             return False
         
-        soup = BeautifulSoup(html_content, 'html.parser')
-        next_button = soup.find("button", string=re.compile("Next"))
-        
         # Check if the next button exists and is not disabled
-        if next_button and not next_button.get("disabled"):
-            return True
-        return False
+        return self.parser.parse_listing(html_content).has_next is True
+    
+    def scrape_page(self, page_num):
+        """Fetch and parse a single listing page, returns its clips and the next button state"""
+        page = self.parse_html(self.fetch_page(page_num))
+        return self.parse_listing(page), page.has_next
+    
+    def probe_total_pages(self):
+        """Read the total number of pages from the pagination of the first listing page"""
+        return self.parser.parse_listing(self.fetch_page(1)).total_pages
+    
+    def save_checkpoint(self, last_completed_page, pending_tiles=None, pending_has_next=None):
+        """Record the crawl progress, including the tiles of the page in progress"""
+        if not self.checkpoint:
+            return
+        
+        self.checkpoint.save({
+            "start_page": self.start_page,
+            "last_completed_page": last_completed_page,
+            "pending_tiles": pending_tiles or [],
+            "pending_has_next": pending_has_next,
+            "total_entries": self.total_entries,
+            "skipped_entries": self.skipped_entries,
+            "known_entries": self.known_entries,
+            "sink_size": self.sink.size() if self.sink else None,
+            "sink_count": self.sink.count if self.sink else None
+        })
+    
+    def restore_checkpoint(self):
+        """Restore the counters and the stream from the checkpoint, returns None if there is none"""
+        state = self.checkpoint.load() if self.checkpoint else None
+        if not state:
+            print("No checkpoint found, starting from the beginning")
+            # The sink was opened for appending, drop the clips of the previous run
+            if self.sink:
+                self.sink.truncate(0, 0)
+            return None
+        
+        self.total_entries = state["total_entries"]
+        self.skipped_entries = state["skipped_entries"]
+        self.known_entries = state["known_entries"]
+        
+        if self.sink and state["sink_size"] is not None:
+            # Drop anything streamed after the checkpoint was written, it will be scraped again
+            self.sink.truncate(state["sink_size"], state["sink_count"])
+            self.seen = SeenClips(iter_json_lines(self.sink.path))
+        elif not self.sink:
+            print("Warning: resuming without a sink, clips scraped before the checkpoint are not included")
+        
+        print(f"Resuming after page {state['last_completed_page']}")
+        return state
     
-    def scrape(self, start_page=1, max_pages=None):
-        """Scrape clips from tracker.gg"""
+    def scrape(self, start_page=1, max_pages=None, known_threshold=1.0, resume=False):
+        """Scrape clips from tracker.gg
+
+        In incremental mode (see load_known_clips) paging stops at the first page
+        where at least known_threshold of the clips are already known. With
+        resume=True the crawl continues after the last page of the checkpoint.
+        """
         page_num = start_page
+        pending_tiles = None
+        pending_has_next = None
+        completed = True
+        
+        if resume:
+            state = self.restore_checkpoint()
+            if state:
+                start_page = state["start_page"]
+                page_num = state["last_completed_page"] + 1
+                pending_tiles = state["pending_tiles"] or None
+                pending_has_next = state["pending_has_next"]
+                if pending_tiles:
+                    # They were filtered before the checkpoint, but the stream doesn't have them yet
+                    pending_tiles = self.seen.filter(pending_tiles, self.tile_key)
+        
+        self.start_page = start_page
         
         while True:
             print(f"Scraping page {page_num}...")
             
-            # Fetch the page
-            html_content = self.fetch_page(page_num)
+            if pending_tiles is not None:
+                # The checkpoint already holds the tiles of this page, only the detail fetches are missing
+                tiles, has_next = pending_tiles, pending_has_next
+                pending_tiles = None
+                print(f"Finishing {len(tiles)} pending clips from the checkpoint")
+            else:
+                # Fetch the page, keeping the clips scraped so far if it keeps failing
+                try:
+                    html_content = self.fetch_page(page_num)
+                except FetchError as e:
+                    print(f"Stopping at page {page_num}, keeping the clips of the earlier pages: {e}")
+                    completed = False
+                    break
+                
+                # Parse the page once for both the clips and the next button
+                page = self.parse_html(html_content)
+                tiles = self.listing_tiles(page)
+                has_next = page.has_next
+                
+                # Record the tiles whose detail pages are about to be fetched
+                self.save_checkpoint(page_num - 1, tiles, has_next)
             
-            # Parse the page
-            page_results = self.parse_page(html_content)
+            page_results = self.process_tiles(tiles)
             
-            # Add the results to the list
-            self.results.extend(page_results)
+            # Add the results to the list (or the stream) and mark the page as done
+            self.add_results(page_results)
+            self.save_checkpoint(page_num)
             
             # Print the number of clips found on this page
             print(f"Found {len(page_results)} clips on page {page_num}")
             
+            # In incremental mode, stop once we've caught up with the previous crawl
+            if self.page_known_entries and self.page_known_entries >= known_threshold * self.page_entries:
+                print(f"{self.page_known_entries} of {self.page_entries} clips on page {page_num} are already known, stopping.")
+                break
+            
             # If no results were found on this page, we've reached the end
             if len(page_results) == 0:
                 print("No more clips found, stopping.")
                 break
             
+            # A disabled next button means this was the last page, no need to fetch an empty one
+            if has_next is False:
+                print("Reached the last page, stopping.")
+                break
+            
             # Check if we should stop based on max_pages
             if max_pages and page_num >= start_page + max_pages - 1:
                 break
             
-            # Go to the next page
+            # Go to the next page (the rate limiter spaces out the requests)
             page_num += 1
-            
-            # Add a delay to avoid rate limiting
-            time.sleep(random.uniform(1, 3))
+        
+        # The crawl is complete, a later run should start from scratch; otherwise --resume continues it
+        if self.checkpoint and completed:
+            self.checkpoint.clear()
         
         # Print statistics
         if self.skipped_entries > 0:
             print(f"Skipped {self.skipped_entries} entries out of {self.total_entries} total entries due to missing video URLs")
+        if self.verified_entries > 0:
+            print(f"Verified {self.verified_entries} derived video URLs against their detail pages, {self.verification_mismatches} mismatches")
+        if self.known_entries > 0:
+            print(f"Skipped {self.known_entries} already known entries")
+        if self.seen.duplicates > 0:
+            print(f"Dropped {self.seen.duplicates} duplicate clips repeated by the shifting listing")
+        if self.cache:
+            print(f"HTTP cache: {self.cache.stats()}")
+        if self.retry_policy.retries or self.retry_policy.failures:
+            print(f"Retries: {self.retry_policy.stats()}")
+        if isinstance(self.rate_limiter, AdaptiveRateLimiter):
+            print(f"Request rates: {self.rate_limiter.rates()} ({self.rate_limiter.throttled_responses} throttled responses)")
         
         return self.results
     
-    def save_to_json(self, filename="tracker_clips.json"):
-        """Save the results to a JSON file"""
-        # Create output directory if it doesn't exist
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        
-        # Check if the file already exists and get the current version
-        version = 1
-        if os.path.exists(filename):
-            try:
-                with open(filename, "r", encoding="utf-8") as f:
-                    existing_data = json.load(f)
-                    if "version" in existing_data:
-                        version = existing_data["version"] + 1
-            except Exception as e:
-                print(f"Error reading existing file: {e}")
-        
-        # Create the structured output with version and data
-        output_data = {
-            "version": version,
-            "data": self.results
-        }
+    def save_to_index(self, filename):
+        """Merge the crawl into the clip index, returns the clips to write in index order
+        
+        An incremental crawl only adds and updates clips; a full crawl also
+        removes the clips that are no longer listed.
+        """
+        # First run with an index: start from the previous output
+        previous_clips = load_previous_clips(filename) if not len(self.index) else None
+        if previous_clips:
+            self.index.update(previous_clips)
+        
+        if self.sink:
+            self.sink.close()
+            clips = iter_json_lines(self.sink.path)
+        else:
+            clips = self.results
+        
+        stats = self.index.update(clips)
+        if self.known_keys is None:
+            stats["removed"] = len(self.index.prune())
+        print(f"Clip index version {self.index.version}: {stats}")
+        return self.index.records()
+    
+    def save_to_json(self, filename="tracker_clips.json", compact=False):
+        """Save the results to a JSON file (minified with compact, compressed if it ends in .gz or .zst)"""
+        # The version comes from the sidecar, the previous output is only read if it's merged
+        version = read_version(filename) + 1
+        
+        # With an index the crawl is merged into the latest record of every clip
+        if self.index is not None:
+            count = write_clips_json(filename, self.save_to_index(filename), version, compact)
+            print(f"Saved {count} clips to {filename}")
+            return
         
-        # Save the results to a JSON file
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, indent=4, ensure_ascii=False)
+        # In incremental mode only the new clips were scraped, merge them into the previous data
+        previous_clips = load_previous_clips(filename) if self.known_keys is not None else None
         
-        print(f"Saved {len(self.results)} clips to {filename}")
+        # Streaming mode: build the document from the stream without loading it
+        if self.sink:
+            count = self.sink.finalize(filename, version, previous_clips, compact)
+            print(f"Saved {count} clips to {filename} ({self.sink.count} scraped in this run)")
+            return
+        
+        data = self.results
+        if previous_clips is not None:
+            data = merge_clips(self.results, previous_clips)
+        
+        # Save the structured output with version and data
+        write_clips_json(filename, data, version, compact)
+        
+        print(f"Saved {len(data)} clips to {filename} ({len(self.results)} scraped in this run)")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Valorant guide clips from tracker.gg")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only scrape clips that are newer than the previous output")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream clips to output/tracker_clips.jsonl as they are scraped")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted --stream crawl from output/tracker_checkpoint.json")
+    parser.add_argument("--parser", default="auto", choices=["auto", "selectolax", "lxml", "html.parser"],
+                        help="HTML parser backend")
+    parser.add_argument("--compact", action="store_true", help="write minified JSON instead of indented JSON")
+    parser.add_argument("--compress", choices=["gzip", "zstd"],
+                        help="compress the output (.gz or .zst appended to the file name, zstd needs zstandard)")
+    parser.add_argument("--report", default="output/run_report.json",
+                        help="JSON run report with request latencies, bytes, parse times, retries and skip reasons")
+    parser.add_argument("--prometheus", default=None, help="also write the metrics to this Prometheus text file")
+    args = parser.parse_args()
+    
     # Create output directory if it doesn't exist
     os.makedirs("output", exist_ok=True)
     
-    # Create the scraper
-    scraper = TrackerScraper()
+    # Create the scraper with a persistent response cache so reruns don't redownload everything
+    # Resuming needs the clips streamed before the interruption, so it always streams
+    sink = JsonLinesSink("output/tracker_clips.jsonl", append=args.resume) if args.stream or args.resume else None
+    scraper = TrackerScraper(
+        cache=HttpCache("output/http_cache.sqlite"),
+        parser=args.parser,
+        sink=sink,
+        checkpoint=Checkpoint("output/tracker_checkpoint.json"),
+        index=ClipIndex("output/clip_index.sqlite")
+    )
+    
+    # Incremental mode: stop at the clips we already have and merge the new ones
+    output_file = with_compression("output/tracker_clips.json", args.compress)
+    if args.incremental:
+        scraper.load_known_clips(output_file)
     
     # Scrape the clips (optionally specify max_pages to limit the number of pages)
     # scraper.scrape(max_pages=5)  # Uncomment to limit to 5 pages
-    scraper.scrape()
+    scraper.scrape(resume=args.resume)
     
     # Save the results to a JSON file
-    scraper.save_to_json("output/tracker_clips.json")
+    scraper.save_to_json(output_file, compact=args.compact)
+    
+    # Where the time went: network, Cloudflare (retries, throttling) or parsing
+    write_run_metrics(scraper, args.report, args.prometheus)